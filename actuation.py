@@ -0,0 +1,158 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class PynputBackend:
+    """Pointer control through pynput: one call per move, no validation or sleeps"""
+
+    def __init__(self):
+        from pynput.mouse import Button, Controller
+        self.controller = Controller()
+        self.buttons = {'left': Button.left, 'right': Button.right, 'middle': Button.middle}
+
+    def move(self, x, y):
+        self.controller.position = (x, y)
+
+    def click(self, button, count=1):
+        self.controller.click(self.buttons[button], count)
+
+
+class PyautoguiBackend:
+    """Pointer control through pyautogui, without its per-call PAUSE sleep"""
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+        pyautogui.FAILSAFE = False
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button, count=1):
+        self.pyautogui.click(button=button, clicks=count, _pause=False)
+
+
+class NullBackend:
+    """Moves nothing; records (time, action, args) for tests and headless runs"""
+
+    def __init__(self, limit=100000):
+        self.events = collections.deque(maxlen=limit)
+
+    def move(self, x, y):
+        self.events.append((time.perf_counter(), 'move', (x, y)))
+
+    def click(self, button, count=1):
+        self.events.append((time.perf_counter(), 'click', (button, count)))
+
+
+BACKENDS = {'pynput': PynputBackend, 'pyautogui': PyautoguiBackend, 'null': NullBackend}
+
+
+def make_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown actuation backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class Actuator:
+    """Drives a backend from its own thread so pointer I/O stays off the tracking loop.
+
+    move_to() only records the latest target, so targets arriving faster than
+    the display refreshes are coalesced into one pointer update per refresh.
+    Targets that round to the pixel the pointer is already on are skipped.
+    Clicks are queued in order, and any pending move is sent before them.
+
+    With a predictor (e.g. tracking.LandmarkPredictor) refreshes that get no
+    new target move the pointer to where the recent targets extrapolate to,
+    so it keeps moving at display rate between camera frames. Prediction runs
+    for at most the predictor's max_horizon after the last target, and hold()
+    ends it early.
+    """
+
+    def __init__(self, backend, refresh_hz=60, predictor=None):
+        self.backend = backend
+        self.interval = 1 / refresh_hz
+        self.predictor = predictor
+        self.condition = threading.Condition()
+        self.target = None
+        self.clicks = collections.deque()
+        self.position = None
+        self.last_tick = 0.0
+        self.running = False
+        self.moves_sent = 0
+        self.moves_skipped = 0
+        self.moves_predicted = 0
+        self.thread = threading.Thread(target=self._run, name='actuation', daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=1)
+
+    def move_to(self, x, y):
+        with self.condition:
+            if self.target is not None:
+                self.moves_skipped += 1
+            self.target = (x, y)
+            if self.predictor is not None:
+                self.predictor.update(np.array((x, y), dtype=float), time.perf_counter())
+            self.condition.notify()
+
+    def hold(self):
+        """Stop predicting from the last target, e.g. when cursor control ends"""
+        with self.condition:
+            if self.predictor is not None:
+                self.predictor.reset()
+
+    def click(self, button='left', count=1):
+        with self.condition:
+            self.clicks.append((button, count))
+            self.condition.notify()
+
+    def _predicting(self, now):
+        predictor = self.predictor
+        return predictor is not None and predictor.points is not None and now - predictor.time < predictor.max_horizon
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while (self.running and self.target is None and not self.clicks
+                       and not self._predicting(time.perf_counter())):
+                    self.condition.wait()
+                if not self.running:
+                    return
+                # Clicks go out at once; a lone move waits for the next refresh slot
+                now = time.perf_counter()
+                wait = 0 if self.clicks else self.last_tick + self.interval - now
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                self.last_tick = now
+                target, self.target = self.target, None
+                clicks = list(self.clicks)
+                self.clicks.clear()
+                if target is None and not clicks and self._predicting(now):
+                    target = tuple(self.predictor.predict(now))
+                    self.moves_predicted += 1
+            if target is not None:
+                self._move(target)
+            for button, count in clicks:
+                self.backend.click(button, count)
+
+    def _move(self, target):
+        position = (round(target[0]), round(target[1]))
+        if position == self.position:
+            self.moves_skipped += 1
+            return
+        self.backend.move(*position)
+        self.position = position
+        self.moves_sent += 1
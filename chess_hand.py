@@ -0,0 +1,114 @@
+import os
+
+import cv2
+import mediapipe as mp
+
+import features
+import filters
+import gestures
+import pipeline
+import recording
+import tracking
+from features import HandFeatures, INDEX_FINGER_TIP
+# The event format is shared with the chess client
+from practice_2 import handinput
+
+# Drives practice_2/client.py directly: the fingertip position on the board and
+# chess gestures go to the client as UDP events, with no OS cursor in between.
+# Start the client with CHESS_HAND_PORT set to the same port.
+HAND_PORT = int(os.environ.get('CHESS_HAND_PORT', handinput.HAND_PORT))
+
+mpHands = mp.solutions.hands
+hands = mpHands.Hands(
+    static_image_mode=False,
+    model_complexity=1,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+    max_num_hands=1
+)
+light_hands = mpHands.Hands(
+    static_image_mode=False,
+    model_complexity=0,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+    max_num_hands=1
+)
+
+roi = tracking.RoiTracker()
+inference = tracking.AdaptiveInference(hands, light_hands, roi)
+landmark_filter = filters.OneEuroFilter(min_cutoff=1.0, beta=10.0)
+engine = gestures.GestureEngine(gestures.CHESS_RULES)
+
+# The calibrated part of the camera view covers the board
+CALIBRATION_FILE = os.environ.get('HAND_CALIBRATION', 'calibration.json')
+board_area = filters.ActiveArea.load(CALIBRATION_FILE) if os.path.exists(CALIBRATION_FILE) else filters.ActiveArea()
+
+# Optional per-frame log of landmarks and gestures (see recording.py)
+RECORDING_FILE = os.environ.get('HAND_RECORDING')
+
+
+def infer_frame(frame):
+    frame = cv2.flip(frame, 1)  # Mirror image
+    return frame, inference.process(frame)
+
+
+def publish(sender, processed, now):
+    """Send the fingertip position and any chess gestures; the fired gesture names"""
+    if not processed.multi_hand_landmarks:
+        # Brief tracking dropouts keep a held pinch held
+        if engine.hand_lost(now):
+            landmark_filter.reset()
+        return []
+    hand = HandFeatures(landmark_filter(features.landmark_array(processed.multi_hand_landmarks[0]), now))
+    x, y = board_area.to_unit(hand.points[INDEX_FINGER_TIP])
+    # Position first, so the client acts on the square the gesture was made over
+    sender.send(handinput.POINTER, x, y)
+    fired = engine.evaluate(hand, now)
+    for name in fired:
+        sender.send(handinput.GESTURE_EVENTS[name], x, y)
+    return fired
+
+
+def main():
+    draw = mp.solutions.drawing_utils
+    cap = cv2.VideoCapture(0)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    print(f"Sending board events to 127.0.0.1:{HAND_PORT}")
+    print("Pinch: pick up, release: put down, open palm: cancel, two fingers: choose promotion")
+
+    sender = handinput.HandEventSender(port=HAND_PORT)
+    recorder = recording.Recorder(RECORDING_FILE, engine.names) if RECORDING_FILE else None
+    pipe = pipeline.Pipeline(cap, infer_frame).start()
+    last_gesture = ''
+    try:
+        for packet in pipe.results():
+            frame, processed = packet.frame, packet.result
+            fired = publish(sender, processed, packet.captured_at)
+            if recorder:
+                recorder.record(packet.captured_at, packet.index, *recording.hand_info(processed), fired)
+            if fired:
+                last_gesture = ', '.join(fired)
+            if processed.multi_hand_landmarks:
+                draw.draw_landmarks(frame, processed.multi_hand_landmarks[0], mpHands.HAND_CONNECTIONS)
+            cv2.putText(frame, last_gesture, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(frame, pipe.stats(), (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+            cv2.imshow('Hand Chess Control', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        pipe.stop()
+        if sender.failed:
+            print(f"{sender.failed} hand events could not be sent; is the client running with CHESS_HAND_PORT={HAND_PORT}?")
+        sender.close()
+        if recorder:
+            recorder.close()
+            print(f"Recorded {recorder.written} frames to {RECORDING_FILE} ({recorder.dropped} dropped)")
+        cap.release()
+        cv2.destroyAllWindows()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_CMC, THUMB_MCP, THUMB_IP, THUMB_TIP = 1, 2, 3, 4
+INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_DIP, INDEX_FINGER_TIP = 5, 6, 7, 8
+MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_DIP, MIDDLE_FINGER_TIP = 9, 10, 11, 12
+RING_FINGER_MCP, RING_FINGER_PIP, RING_FINGER_DIP, RING_FINGER_TIP = 13, 14, 15, 16
+PINKY_MCP, PINKY_PIP, PINKY_DIP, PINKY_TIP = 17, 18, 19, 20
+NUM_LANDMARKS = 21
+
+# Scale of util.get_distance, which the gesture thresholds were tuned in
+DISTANCE_SCALE = 1000
+
+# (a, b, c) landmark triples: the angle at b between b->a and b->c. Every
+# finger joint, plus the whole-finger bends (MCP, PIP, tip) the gestures use.
+ANGLES = np.array([
+    (WRIST, THUMB_CMC, THUMB_MCP), (THUMB_CMC, THUMB_MCP, THUMB_IP), (THUMB_MCP, THUMB_IP, THUMB_TIP),
+    (WRIST, INDEX_FINGER_MCP, INDEX_FINGER_PIP), (INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_DIP),
+    (INDEX_FINGER_PIP, INDEX_FINGER_DIP, INDEX_FINGER_TIP),
+    (WRIST, MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP), (MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_DIP),
+    (MIDDLE_FINGER_PIP, MIDDLE_FINGER_DIP, MIDDLE_FINGER_TIP),
+    (WRIST, RING_FINGER_MCP, RING_FINGER_PIP), (RING_FINGER_MCP, RING_FINGER_PIP, RING_FINGER_DIP),
+    (RING_FINGER_PIP, RING_FINGER_DIP, RING_FINGER_TIP),
+    (WRIST, PINKY_MCP, PINKY_PIP), (PINKY_MCP, PINKY_PIP, PINKY_DIP), (PINKY_PIP, PINKY_DIP, PINKY_TIP),
+    (THUMB_CMC, THUMB_MCP, THUMB_TIP),
+    (INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_TIP),
+    (MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_TIP),
+    (RING_FINGER_MCP, RING_FINGER_PIP, RING_FINGER_TIP),
+    (PINKY_MCP, PINKY_PIP, PINKY_TIP),
+])
+ANGLE_INDEX = {tuple(triple): i for i, triple in enumerate(ANGLES.tolist())}
+
+
+def landmark_array(hand_landmarks):
+    """(21, 3) float array of a MediaPipe hand's normalized x, y, z"""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark])
+
+
+def joint_angles(points):
+    """Angle in degrees at every ANGLES triple, computed like util.get_angle (x and y only)
+
+    points is (21, 3), or (frames, 21, 3) for a batch; the result is (len(ANGLES),) or (frames, len(ANGLES)).
+    """
+    a = points[..., ANGLES[:, 0], :2]
+    b = points[..., ANGLES[:, 1], :2]
+    c = points[..., ANGLES[:, 2], :2]
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) -
+               np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    return np.abs(np.degrees(radians))
+
+
+def pairwise_distances(points):
+    """(21, 21) x/y distances between every pair of landmarks, in normalized units (batched like joint_angles)"""
+    xy = points[..., :2]
+    return np.linalg.norm(xy[..., :, None, :] - xy[..., None, :, :], axis=-1)
+
+
+class HandFeatures:
+    """Landmarks of one hand with all joint angles and pairwise distances, computed once per frame"""
+
+    __slots__ = ('points', 'angles', 'distances')
+
+    def __init__(self, points):
+        self.points = points
+        self.angles = joint_angles(points)
+        self.distances = pairwise_distances(points)
@@ -0,0 +1,89 @@
+import json
+import math
+
+import numpy as np
+
+
+class OneEuroFilter:
+    """One Euro filter (Casiez et al.) applied element-wise to an array, e.g. all (21, 3) landmarks.
+
+    A low-pass filter whose cutoff rises with speed: heavy smoothing while
+    the hand is still removes jitter, and a high cutoff during fast moves
+    keeps lag low. min_cutoff (Hz) sets the smoothing at rest and beta how
+    quickly it lets go with speed (in input units per second).
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=10.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.derivative = None
+        self.time = None
+
+    @staticmethod
+    def alpha(cutoff, dt):
+        tau = 1 / (2 * math.pi * cutoff)
+        return 1 / (1 + tau / dt)
+
+    def __call__(self, value, now):
+        """Filtered copy of `value` sampled at time `now` (seconds)"""
+        value = np.asarray(value, dtype=float)
+        if self.value is None or now <= self.time:
+            if self.value is None:
+                self.value = value.copy()
+                self.derivative = np.zeros_like(value)
+            self.time = now
+            return self.value.copy()
+        dt = now - self.time
+        derivative = (value - self.value) / dt
+        self.derivative += self.alpha(self.d_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        self.value += self.alpha(cutoff, dt) * (value - self.value)
+        self.time = now
+        return self.value.copy()
+
+
+class ActiveArea:
+    """Rectangle of normalized camera space that maps onto the whole screen.
+
+    The default covers the middle of the frame, where a hand comfortably
+    reaches; calibrate() fits it to where the fingertip actually went.
+    """
+
+    def __init__(self, left=0.15, top=0.1, right=0.85, bottom=0.75):
+        self.low = np.array([left, top])
+        self.high = np.array([right, bottom])
+
+    def to_unit(self, points):
+        """Position of normalized (x, y) points within the area, 0-1 on both axes; outside clamps to the edge"""
+        return np.clip((np.asarray(points)[..., :2] - self.low) / (self.high - self.low), 0, 1)
+
+    def to_screen(self, points, width, height):
+        """Screen pixels for normalized (x, y) points, shape (..., 2)"""
+        return self.to_unit(points) * (width - 1, height - 1)
+
+    @classmethod
+    def calibrate(cls, samples, margin=0.02):
+        """Area spanning the recorded (x, y) samples, ignoring the outer 2% of them"""
+        if len(samples) < 30:
+            raise ValueError("Too few calibration samples; keep the hand in view while calibrating")
+        samples = np.asarray(samples)[:, :2]
+        low = np.percentile(samples, 2, axis=0) - margin
+        high = np.percentile(samples, 98, axis=0) + margin
+        if np.any(high - low < 0.1):
+            raise ValueError("Calibration samples cover too small an area")
+        return cls(*np.clip(low, 0, 1), *np.clip(high, 0, 1))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'low': self.low.tolist(), 'high': self.high.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(*data['low'], *data['high'])
@@ -0,0 +1,198 @@
+import collections
+import time
+
+import numpy as np
+
+import features
+from features import (INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_TIP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_TIP,
+                      NUM_LANDMARKS, PINKY_PIP, PINKY_TIP, RING_FINGER_PIP, RING_FINGER_TIP, THUMB_TIP)
+
+# A gesture is a named set of conditions that must all hold. Conditions are
+# (kind, landmarks, op, threshold) with op '<' or '>':
+#   ('angle', (a, b, c), ...)  joint angle at b in degrees, one of features.ANGLES
+#   ('distance', (i, j), ...)  distance on util.get_distance's 0-1000 scale
+#   ('above', (i, j), ...)     how far landmark i is above landmark j (normalized y)
+# A rule with no conditions only fires from the trained classifier.
+# cooldown is the minimum time in seconds between two firings; an edge rule
+# fires only on the frame it becomes true rather than on every frame it holds.
+Rule = collections.namedtuple('Rule', 'name conditions cooldown edge', defaults=(0.0, False))
+
+ANGLE_COLUMNS = len(features.ANGLES)
+PAIR_COLUMNS = NUM_LANDMARKS * NUM_LANDMARKS
+FEATURE_COLUMNS = ANGLE_COLUMNS + 2 * PAIR_COLUMNS
+
+# Thumb and index pinched together / apart, with a gap between so a pinch held near the edge does not flicker
+PINCH_CLOSED = 40
+PINCH_OPEN = 70
+
+# Minimum time between two clicks
+CLICK_COOLDOWN = 0.5
+
+# Pointer control for mouse.py / mm.py
+MOUSE_RULES = [
+    # Mouse control mode: index finger extended and thumb tucked in (close to palm)
+    Rule('cursor_control', [
+        ('above', (INDEX_FINGER_TIP, INDEX_FINGER_PIP), '>', 0),
+        ('above', (INDEX_FINGER_PIP, INDEX_FINGER_MCP), '>', 0),
+        ('distance', (THUMB_TIP, INDEX_FINGER_MCP), '<', 100),
+    ]),
+    Rule('left_click', [
+        ('angle', (5, 6, 8), '<', 50),
+        ('angle', (9, 10, 12), '>', 90),
+        ('distance', (THUMB_TIP, INDEX_FINGER_TIP), '>', 50),
+    ], cooldown=CLICK_COOLDOWN),
+]
+
+CHESS_RULES = [
+    # Pinch to pick up the piece under the fingertip, release to put it down
+    Rule('pick_up', [('distance', (THUMB_TIP, INDEX_FINGER_TIP), '<', PINCH_CLOSED)], cooldown=0.3, edge=True),
+    Rule('drop', [('distance', (THUMB_TIP, INDEX_FINGER_TIP), '>', PINCH_OPEN)], cooldown=0.3, edge=True),
+    # Open palm with the thumb out puts a held piece back
+    Rule('cancel', [
+        ('above', (INDEX_FINGER_TIP, INDEX_FINGER_PIP), '>', 0),
+        ('above', (MIDDLE_FINGER_TIP, MIDDLE_FINGER_PIP), '>', 0),
+        ('above', (RING_FINGER_TIP, RING_FINGER_PIP), '>', 0),
+        ('above', (PINKY_TIP, PINKY_PIP), '>', 0),
+        ('distance', (THUMB_TIP, INDEX_FINGER_MCP), '>', 100),
+    ], cooldown=1.0, edge=True),
+    # Index and middle up, ring and pinky folded: choose the promotion piece under the fingertip
+    Rule('promote', [
+        ('above', (INDEX_FINGER_TIP, INDEX_FINGER_PIP), '>', 0),
+        ('above', (MIDDLE_FINGER_TIP, MIDDLE_FINGER_PIP), '>', 0),
+        ('above', (RING_FINGER_TIP, RING_FINGER_PIP), '<', 0),
+        ('above', (PINKY_TIP, PINKY_PIP), '<', 0),
+    ], cooldown=1.0, edge=True),
+]
+
+
+def feature_vector(hand):
+    """Every value a condition can test, as one flat array: angles, scaled distances, then y offsets"""
+    y = hand.points[:, 1]
+    return np.concatenate((
+        hand.angles,
+        hand.distances.ravel() * features.DISTANCE_SCALE,
+        (y[None, :] - y[:, None]).ravel(),
+    ))
+
+
+def condition_column(kind, landmarks):
+    """Index of a condition's value in feature_vector()"""
+    if kind == 'angle':
+        if tuple(landmarks) not in features.ANGLE_INDEX:
+            raise ValueError(f"No angle feature for landmarks {landmarks}")
+        return features.ANGLE_INDEX[tuple(landmarks)]
+    i, j = landmarks
+    if kind == 'distance':
+        return ANGLE_COLUMNS + i * NUM_LANDMARKS + j
+    if kind == 'above':
+        return ANGLE_COLUMNS + PAIR_COLUMNS + i * NUM_LANDMARKS + j
+    raise ValueError(f"Unknown condition kind {kind!r}")
+
+
+class LinearClassifier:
+    """Small softmax classifier over feature_vector(), loaded from an .npz file.
+
+    The file holds `weights` (labels x columns), `bias` (labels), `labels`
+    (gesture names) and optionally `columns`, the feature_vector() indices the
+    weights apply to.
+    """
+
+    def __init__(self, weights, bias, labels, columns=None):
+        self.weights = weights
+        self.bias = bias
+        self.labels = list(labels)
+        self.columns = columns
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        columns = data['columns'] if 'columns' in data else None
+        return cls(data['weights'], data['bias'], [str(label) for label in data['labels']], columns)
+
+    def predict(self, vector):
+        """(label, probability) of the most likely gesture"""
+        if self.columns is not None:
+            vector = vector[self.columns]
+        scores = self.weights @ vector + self.bias
+        scores = np.exp(scores - scores.max())
+        best = int(scores.argmax())
+        return self.labels[best], float(scores[best] / scores.sum())
+
+
+class GestureEngine:
+    """Evaluates a table of Rules against a HandFeatures in one batched pass.
+
+    The rules are compiled once into flat arrays: the feature column,
+    threshold and comparison of every condition, and a rules x conditions
+    membership matrix. Each frame gathers the needed columns, compares them
+    all at once and counts failed conditions per rule with one matrix product,
+    so adding gestures adds no per-gesture Python work.
+    """
+
+    def __init__(self, rules, classifier=None, min_confidence=0.8, lost_timeout=0.3):
+        self.rules = list(rules)
+        self.names = [rule.name for rule in self.rules]
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.lost_timeout = lost_timeout
+
+        columns, thresholds, less = [], [], []
+        self.membership = np.zeros((len(self.rules), sum(len(rule.conditions) for rule in self.rules)), dtype=np.int32)
+        for r, rule in enumerate(self.rules):
+            for kind, landmarks, op, threshold in rule.conditions:
+                if op not in ('<', '>'):
+                    raise ValueError(f"Unknown comparison {op!r} in gesture {rule.name!r}")
+                self.membership[r, len(columns)] = 1
+                columns.append(condition_column(kind, landmarks))
+                thresholds.append(threshold)
+                less.append(op == '<')
+        self.columns = np.array(columns, dtype=np.intp)
+        self.thresholds = np.array(thresholds, dtype=float)
+        self.less = np.array(less, dtype=bool)
+        self.has_conditions = self.membership.any(axis=1)
+        self.cooldowns = np.array([rule.cooldown for rule in self.rules], dtype=float)
+        self.edge = np.array([rule.edge for rule in self.rules], dtype=bool)
+
+        self.was_active = np.zeros(len(self.rules), dtype=bool)
+        self.last_fired = np.full(len(self.rules), -np.inf)
+        self.last_seen = -np.inf
+
+    def active(self, hand):
+        """Boolean array, in rule order, of the gestures whose conditions hold for this hand"""
+        vector = feature_vector(hand)
+        values = vector[self.columns]
+        passed = np.where(self.less, values < self.thresholds, values > self.thresholds)
+        active = (self.membership @ ~passed) == 0
+        active &= self.has_conditions
+        if self.classifier is not None:
+            label, confidence = self.classifier.predict(vector)
+            if confidence >= self.min_confidence and label in self.names:
+                active[self.names.index(label)] = True
+        return active
+
+    def evaluate(self, hand, now=None):
+        """Names of the gestures that fire on this frame, in rule order"""
+        now = time.monotonic() if now is None else now
+        active = self.active(hand)
+        fired = active & ~(self.edge & self.was_active)
+        fired &= now - self.last_fired >= self.cooldowns
+        self.was_active = active
+        self.last_seen = now
+        self.last_fired[fired] = now
+        return [name for name, hit in zip(self.names, fired) if hit]
+
+    def reset(self):
+        """Forget held gestures, e.g. when the hand leaves the frame"""
+        self.was_active[:] = False
+
+    def hand_lost(self, now=None):
+        """Call on frames without a hand; True once it has been gone lost_timeout seconds.
+
+        Held gestures are only forgotten then, so a tracking dropout of a frame
+        or two in the middle of a held pinch does not fire it again.
+        """
+        now = time.monotonic() if now is None else now
+        if now - self.last_seen < self.lost_timeout:
+            return False
+        self.reset()
+        return True
@@ -1,13 +1,22 @@
 import cv2
+import os
 import mediapipe as mp
 import pyautogui
-import random
-import util
-import time
-from pynput.mouse import Button, Controller
-
-# Initialize mouse controller and screen dimensions
-mouse = Controller()
+import actuation
+import features
+import filters
+import gestures
+from features import HandFeatures, INDEX_FINGER_TIP
+import pipeline
+import recording
+import tracking
+
+# Pointer updates run on their own thread; MOUSE_BACKEND picks pynput, pyautogui or null.
+# Between camera frames the pointer follows the predicted path at display rate.
+actuator = actuation.Actuator(actuation.make_backend(os.environ.get('MOUSE_BACKEND', 'pynput')),
+                              predictor=tracking.LandmarkPredictor())
+
+# Screen dimensions
 screen_width, screen_height = pyautogui.size()
 print(f"Screen dimensions: {screen_width}x{screen_height}")
 
@@ -20,168 +29,100 @@ hands = mpHands.Hands(
     min_tracking_confidence=0.5,
     max_num_hands=1
 )
+# Lighter model used while the hand is still
+light_hands = mpHands.Hands(
+    static_image_mode=False,
+    model_complexity=0,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+    max_num_hands=1
+)
 
-# Add smoothing for mouse movement
-class MouseSmoother:
-    def __init__(self, smoothing_factor=0.5):
-        self.prev_x, self.prev_y = screen_width // 2, screen_height // 2
-        self.smoothing_factor = smoothing_factor
-        
-    def smooth_move(self, x, y):
-        # Apply smoothing
-        smooth_x = self.prev_x + self.smoothing_factor * (x - self.prev_x)
-        smooth_y = self.prev_y + self.smoothing_factor * (y - self.prev_y)
-        
-        # Update previous positions
-        self.prev_x, self.prev_y = smooth_x, smooth_y
-        
-        return int(smooth_x), int(smooth_y)
-
-smoother = MouseSmoother(smoothing_factor=0.7)
-
-# Add cooldown for gestures to prevent multiple triggers
-last_action_time = 0
-COOLDOWN_TIME = 0.5  # seconds
+# Speed-adaptive smoothing of all landmarks at once
+landmark_filter = filters.OneEuroFilter(min_cutoff=1.0, beta=10.0)
 
-def move_mouse(index_finger_tip):
-    """Move mouse based on index finger tip position"""
-    if index_finger_tip is not None:
-        # Map hand coordinates (0-1) to screen coordinates
-        # Adding offsets and scaling to reach corners
-        x = int(index_finger_tip.x * screen_width * 1.5)  # Increased scaling for better corner reach
-        y = int(index_finger_tip.y * screen_height * 1.5)  # Increased scaling for better corner reach
-        
-        # Adjust position to better reach all corners
-        x = max(0, min(x, screen_width - 1))
-        y = max(0, min(y, screen_height - 1))
-        
-        # Apply smoothing
-        smooth_x, smooth_y = smoother.smooth_move(x, y)
-        
-        # Actually move the mouse - using both methods for compatibility
-        pyautogui.moveTo(smooth_x, smooth_y)
-        mouse.position = (smooth_x, smooth_y)
-
-def can_perform_action():
-    global last_action_time
-    current_time = time.time()
-    if current_time - last_action_time >= COOLDOWN_TIME:
-        last_action_time = current_time
-        return True
-    return False
-
-def is_thumb_closed(hand_landmarks):
-    """Check if thumb is closed (tucked in)"""
-    thumb_tip = hand_landmarks.landmark[mpHands.HandLandmark.THUMB_TIP]
-    thumb_ip = hand_landmarks.landmark[mpHands.HandLandmark.THUMB_IP]
-    thumb_mcp = hand_landmarks.landmark[mpHands.HandLandmark.THUMB_MCP]
-    index_mcp = hand_landmarks.landmark[mpHands.HandLandmark.INDEX_FINGER_MCP]
-    
-    # Calculate the distance between thumb tip and index MCP
-    thumb_index_dist = ((thumb_tip.x - index_mcp.x)**2 + (thumb_tip.y - index_mcp.y)**2)**0.5
-    
-    # Check if thumb is tucked in (close to palm)
-    return thumb_index_dist < 0.1  # Adjust threshold as needed
-
-def is_left_click(landmark_list, thumb_index_dist):
-    return (
-            util.get_angle(landmark_list[5], landmark_list[6], landmark_list[8]) < 50 and
-            util.get_angle(landmark_list[9], landmark_list[10], landmark_list[12]) > 90 and
-            thumb_index_dist > 50
-    )
-
-# def is_right_click(landmark_list, thumb_index_dist):
-#     return (
-#             util.get_angle(landmark_list[9], landmark_list[10], landmark_list[12]) < 50 and
-#             util.get_angle(landmark_list[5], landmark_list[6], landmark_list[8]) > 90 and
-#             thumb_index_dist > 50
-#     )
-
-# def is_double_click(landmark_list, thumb_index_dist):
-#     return (
-#             util.get_angle(landmark_list[5], landmark_list[6], landmark_list[8]) < 50 and
-#             util.get_angle(landmark_list[9], landmark_list[10], landmark_list[12]) < 50 and
-#             thumb_index_dist > 50
-#     )
-
-# def is_screenshot(landmark_list, thumb_index_dist):
-#     return (
-#             util.get_angle(landmark_list[5], landmark_list[6], landmark_list[8]) < 50 and
-#             util.get_angle(landmark_list[9], landmark_list[10], landmark_list[12]) < 50 and
-#             thumb_index_dist < 50
-#     )
-
-def is_mouse_control_mode(hand_landmarks):
-    """
-    Check if hand is in mouse control mode:
-    - Index finger is extended
-    - Thumb is tucked in (closed)
-    """
-    # Get relevant landmarks
-    index_tip = hand_landmarks.landmark[mpHands.HandLandmark.INDEX_FINGER_TIP]
-    index_pip = hand_landmarks.landmark[mpHands.HandLandmark.INDEX_FINGER_PIP]
-    index_mcp = hand_landmarks.landmark[mpHands.HandLandmark.INDEX_FINGER_MCP]
-    
-    # Check if index finger is extended
-    index_extended = index_tip.y < index_pip.y < index_mcp.y
-    
-    # Check if thumb is tucked in
-    thumb_closed = is_thumb_closed(hand_landmarks)
-    
-    # Mouse control mode is active when index is extended and thumb is closed
-    return index_extended and thumb_closed
+# Part of the camera view mapped onto the whole screen; press 'c' to calibrate it
+CALIBRATION_FILE = os.environ.get('HAND_CALIBRATION', 'calibration.json')
+active_area = filters.ActiveArea.load(CALIBRATION_FILE) if os.path.exists(CALIBRATION_FILE) else filters.ActiveArea()
+# Fingertip positions recorded while calibrating, or None
+calibration_samples = None
 
-def detect_gesture(frame, processed):
-    """Detect hand gestures and perform corresponding actions"""
-    if not processed.multi_hand_landmarks:
+def move_mouse(index_finger_tip):
+    """Move mouse based on index finger tip position (normalized camera x, y)"""
+    # Map the active area of the camera view onto the whole screen
+    x, y = active_area.to_screen(index_finger_tip, screen_width, screen_height)
+    
+    # Hand the target to the actuation thread, which sends at most one update per refresh
+    actuator.move_to(x, y)
+
+def toggle_calibration():
+    """Start recording fingertip positions, or finish and save the active area they cover"""
+    global calibration_samples, active_area
+    if calibration_samples is None:
+        calibration_samples = []
+        print("Calibrating: sweep your index fingertip over the area you want to use, then press 'c' again")
         return
-    
+    try:
+        active_area = filters.ActiveArea.calibrate(calibration_samples)
+        active_area.save(CALIBRATION_FILE)
+        print(f"Active area saved to {CALIBRATION_FILE}")
+    except ValueError as e:
+        print(f"Calibration failed: {e}")
+    calibration_samples = None
+
+# Gesture table, compiled by the engine into one batched check per frame
+GESTURE_RULES = gestures.MOUSE_RULES
+
+# Optional trained classifier (.npz, see gestures.LinearClassifier) adding to the rules
+classifier = gestures.LinearClassifier.load(os.environ['GESTURE_MODEL']) if os.environ.get('GESTURE_MODEL') else None
+engine = gestures.GestureEngine(GESTURE_RULES, classifier)
+
+# Set HAND_RECORDING to a file (e.g. session.hrec) to log every frame's landmarks and
+# fired gestures for tuning the thresholds offline; replay.py reads it back
+RECORDING_FILE = os.environ.get('HAND_RECORDING')
+
+def detect_gesture(frame, processed, now):
+    """Detect hand gestures and perform corresponding actions; the names of the gestures that fired"""
     # Get the first detected hand
     hand_landmarks = processed.multi_hand_landmarks[0]
     
-    # Extract landmark coordinates
-    landmark_list = []
-    for lm in hand_landmarks.landmark:
-        landmark_list.append((lm.x, lm.y))
+    if len(hand_landmarks.landmark) < features.NUM_LANDMARKS:  # Need full hand with 21 landmarks
+        return []
     
-    if len(landmark_list) < 21:  # Need full hand with 21 landmarks
-        return
+    # Filter the (21, 3) landmark array, then compute every joint angle and distance from it once
+    hand = HandFeatures(landmark_filter(features.landmark_array(hand_landmarks), now))
+    fired = engine.evaluate(hand, now)
     
     # Get index finger tip for mouse movement
-    index_finger_tip = hand_landmarks.landmark[mpHands.HandLandmark.INDEX_FINGER_TIP]
-    thumb_tip = hand_landmarks.landmark[mpHands.HandLandmark.THUMB_TIP]
-    
-    # Calculate distance between thumb and index finger
-    thumb_index_dist = util.get_distance([
-        (thumb_tip.x, thumb_tip.y), 
-        (index_finger_tip.x, index_finger_tip.y)
-    ])
+    index_finger_tip = hand.points[INDEX_FINGER_TIP, :2]
+    if calibration_samples is not None:
+        calibration_samples.append(index_finger_tip)
+        cv2.putText(frame, "Calibrating", (50, 110), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
     
     # Check if the hand is in mouse control mode
-    if is_mouse_control_mode(hand_landmarks):
+    if 'cursor_control' in fired:
         # Only move mouse if in control mode
         move_mouse(index_finger_tip)
         cv2.putText(frame, "Cursor Control ON", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
     else:
+        actuator.hold()
         cv2.putText(frame, "Cursor Control OFF", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
     
     # Check for gesture actions
-    if is_left_click(landmark_list, thumb_index_dist) and can_perform_action():
-        mouse.press(Button.left)
-        mouse.release(Button.left)
+    if 'left_click' in fired:
+        actuator.click('left')
         cv2.putText(frame, "Left Click", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    # elif is_right_click(landmark_list, thumb_index_dist) and can_perform_action():
-    #     mouse.press(Button.right)
-    #     mouse.release(Button.right)
-    #     cv2.putText(frame, "Right Click", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-    # elif is_double_click(landmark_list, thumb_index_dist) and can_perform_action():
-    #     pyautogui.doubleClick()
-    #     cv2.putText(frame, "Double Click", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
-    # elif is_screenshot(landmark_list, thumb_index_dist) and can_perform_action():
-    #     im1 = pyautogui.screenshot()
-    #     label = random.randint(1, 1000)
-    #     im1.save(f'my_screenshot_{label}.png')
-    #     cv2.putText(frame, "Screenshot Taken", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
+    return fired
+
+# Crops each frame around the hand found in the previous one, and picks the
+# model per frame (or predicts landmarks) from how fast the hand is moving
+roi = tracking.RoiTracker()
+inference = tracking.AdaptiveInference(hands, light_hands, roi)
+
+def infer_frame(frame):
+    """Inference stage: mirror the frame and track the hand, as cheaply as its motion allows"""
+    frame = cv2.flip(frame, 1)  # Mirror image
+    return frame, inference.process(frame)
 
 def main():
     draw = mp.solutions.drawing_utils
@@ -190,9 +131,8 @@ def main():
     cap = cv2.VideoCapture(0)
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-    
-    # For FPS calculation
-    prev_time = 0
+    # The capture thread keeps up with the camera, so the driver needs no backlog
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
     
     # Safe mode for pyautogui
     pyautogui.FAILSAFE = False
@@ -201,23 +141,13 @@ def main():
     print("To control mouse: Extend index finger and keep thumb tucked")
     print("To stop control: Extend thumb")
     
-    while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                print("Failed to capture frame")
-                break
-                
-            # Calculate FPS
-            current_time = time.time()
-            fps = 1 / (current_time - prev_time) if prev_time > 0 else 0
-            prev_time = current_time
-            
-            # Process frame
-            frame = cv2.flip(frame, 1)  # Mirror image
-            
-            # Convert to RGB
-            frameRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            processed = hands.process(frameRGB)
+    # Capture and inference run on their own threads; this loop is the actuation/render stage
+    actuator.start()
+    recorder = recording.Recorder(RECORDING_FILE, engine.names) if RECORDING_FILE else None
+    pipe = pipeline.Pipeline(cap, infer_frame).start()
+    try:
+        for packet in pipe.results():
+            frame, processed = packet.frame, packet.result
 
             # Draw hand landmarks if detected
             if processed.multi_hand_landmarks:
@@ -225,23 +155,45 @@ def main():
                     draw.draw_landmarks(frame, hand_landmarks, mpHands.HAND_CONNECTIONS)
                 
                 # Detect gestures and move mouse
-                detect_gesture(frame, processed)
+                fired = detect_gesture(frame, processed, packet.captured_at)
             else:
+                fired = []
+                actuator.hold()
+                # Gestures and smoothing start afresh once the hand has been gone a moment
+                if engine.hand_lost(packet.captured_at):
+                    landmark_filter.reset()
                 cv2.putText(frame, "No hand detected", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            if recorder:
+                recorder.record(packet.captured_at, packet.index, *recording.hand_info(processed), fired)
 
-            # Display FPS
+            # Display FPS and per-stage timings
+            fps = pipe.timers['latency'].rate()
             cv2.putText(frame, f"FPS: {int(fps)}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(frame, f"{pipe.stats()}  {inference.mode}", (10, frame.shape[0] - 100),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
             
             # Display instructions
             cv2.putText(frame, "Index finger: Move", (10, frame.shape[0] - 70), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
             cv2.putText(frame, "Thumb out: Stop control", (10, frame.shape[0] - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            cv2.putText(frame, "C: Calibrate area", (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
             
             # Display frame
             cv2.imshow('Hand Mouse Control', frame)
             
-            # Exit on 'q' press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # Exit on 'q' press, calibrate on 'c'
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            if key == ord('c'):
+                toggle_calibration()
+    finally:
+        pipe.stop()
+        actuator.stop()
+        if recorder:
+            recorder.close()
+            print(f"Recorded {recorder.written} frames to {RECORDING_FILE} ({recorder.dropped} dropped)")
+        cap.release()
+        cv2.destroyAllWindows()
 
 if __name__ == '__main__':
     main()
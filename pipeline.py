@@ -0,0 +1,218 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+# Result of one captured frame after inference, handed to the actuation/render stage
+Packet = collections.namedtuple('Packet', 'index captured_at frame result')
+
+
+class LatestSlot:
+    """Hand-off between two stages that keeps only the newest item.
+
+    A producer never blocks and a slow consumer never sees a backlog: putting
+    an item replaces one that was not taken yet, which is counted as dropped.
+    With blocking=True the producer instead waits until the item is taken, so
+    nothing is dropped (for replaying files, where every frame matters).
+    """
+
+    def __init__(self, blocking=False):
+        self.condition = threading.Condition()
+        self.item = None
+        self.closed = False
+        self.blocking = blocking
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            while self.blocking and self.item is not None and not self.closed:
+                self.condition.wait()
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.condition.notify_all()
+
+    def get(self):
+        """Wait for the next item; None once the slot is closed"""
+        with self.condition:
+            while self.item is None and not self.closed:
+                self.condition.wait()
+            item, self.item = self.item, None
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class StageTimer:
+    """Rolling average duration and rate of one pipeline stage"""
+
+    def __init__(self, window=30):
+        self.samples = collections.deque(maxlen=window)
+        self.stamps = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.stamps.append(time.perf_counter())
+
+    def mean_ms(self):
+        return 1000 * sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def rate(self):
+        if len(self.stamps) < 2:
+            return 0.0
+        return (len(self.stamps) - 1) / (self.stamps[-1] - self.stamps[0])
+
+
+class Pipeline:
+    """Camera capture, inference and actuation as three pipelined stages.
+
+    A capture thread reads `source` (anything with a cv2.VideoCapture style
+    read() returning (ok, frame), such as the file sources below) as fast as
+    it delivers frames, so the driver buffer never fills with stale ones. An
+    inference thread runs `infer` on the newest frame, and the caller's loop
+    over results() is the actuation and render stage. Each hand-off is a
+    LatestSlot, so every stage works on the freshest data and slow stages skip
+    frames instead of adding latency. lossless=True makes the stages wait for
+    each other instead, for replaying recordings frame by frame at full speed.
+    """
+
+    def __init__(self, source, infer, lossless=False):
+        self.source = source
+        self.infer = infer
+        self.frames = LatestSlot(blocking=lossless)
+        self.results_slot = LatestSlot(blocking=lossless)
+        self.running = threading.Event()
+        self.timers = {name: StageTimer() for name in ('capture', 'inference', 'actuation', 'latency')}
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name='capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='inference', daemon=True),
+        ]
+
+    def start(self):
+        self.running.set()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stop both threads; waits for the capture thread so the source can be released safely"""
+        self.running.clear()
+        self.frames.close()
+        self.results_slot.close()
+        for thread in self.threads:
+            thread.join(timeout=1)
+
+    def _capture_loop(self):
+        index = 0
+        last = time.perf_counter()
+        while self.running.is_set():
+            ok, frame = self.source.read()
+            now = time.perf_counter()
+            if not ok:
+                if not getattr(self.source, 'finite', False):
+                    print("Failed to capture frame")
+                break
+            self.timers['capture'].add(now - last)
+            last = now
+            self.frames.put((index, now, frame))
+            index += 1
+        self.frames.close()
+
+    def _inference_loop(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            index, captured_at, frame = item
+            start = time.perf_counter()
+            frame, result = self.infer(frame)
+            self.timers['inference'].add(time.perf_counter() - start)
+            self.results_slot.put(Packet(index, captured_at, frame, result))
+        self.results_slot.close()
+
+    def results(self):
+        """Yield each Packet to the actuation stage, timing how long the caller spends on it"""
+        while True:
+            packet = self.results_slot.get()
+            if packet is None:
+                return
+            start = time.perf_counter()
+            yield packet
+            done = time.perf_counter()
+            self.timers['actuation'].add(done - start)
+            self.timers['latency'].add(done - packet.captured_at)
+
+    def stats(self):
+        """One-line summary of stage timings and frames dropped between stages"""
+        timers = self.timers
+        return (f"cam {timers['capture'].rate():.0f}fps  "
+                f"infer {timers['inference'].mean_ms():.1f}ms  "
+                f"act {timers['actuation'].mean_ms():.1f}ms  "
+                f"lat {timers['latency'].mean_ms():.0f}ms  "
+                f"drop {self.frames.dropped}/{self.results_slot.dropped}")
+
+
+class VideoFileSource:
+    """Frames of a recorded video, for replaying a session without a webcam"""
+
+    finite = True
+
+    def __init__(self, path):
+        import cv2
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise OSError(f"Cannot open video {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self):
+        return self.capture.read()
+
+    def timestamp(self, index):
+        """Time of frame `index` in the recording, in seconds"""
+        return index / self.fps
+
+    def release(self):
+        self.capture.release()
+
+
+class LandmarkFileSource:
+    """Recorded landmarks instead of images: a (frames, 21, 3) .npy array, memory-mapped.
+
+    Each read() gives one frame's (21, 3) array, NaN where no hand was seen.
+    Hand tracking is skipped for these, so gesture detection can be replayed
+    and profiled on its own. `landmarks` is the .npy path or an array already
+    loaded, such as the landmarks of a recording.load() file.
+    """
+
+    finite = True
+
+    def __init__(self, landmarks, fps=30.0, timestamps=None):
+        self.landmarks = np.load(landmarks, mmap_mode='r') if isinstance(landmarks, str) else landmarks
+        if self.landmarks.ndim != 3 or self.landmarks.shape[1:] != (21, 3):
+            raise ValueError(f"Landmarks of shape {self.landmarks.shape}, expected (frames, 21, 3)")
+        self.fps = fps
+        self.timestamps = timestamps
+        self.index = 0
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def read(self):
+        if self.index >= len(self.landmarks):
+            return False, None
+        points = np.array(self.landmarks[self.index])
+        self.index += 1
+        return True, points
+
+    def timestamp(self, index):
+        if self.timestamps is not None:
+            return float(self.timestamps[index])
+        return index / self.fps
+
+    def release(self):
+        pass
@@ -0,0 +1,579 @@
+# Bitboard position model used by the client for move legality.
+# Squares are numbered row * 8 + col with row 0 at the top of the screen
+# (black's back rank), so they line up with the client's board[row][col].
+
+import random
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+COLOR_NAMES = ('white', 'black')
+TYPE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+COLORS = {name: i for i, name in enumerate(COLOR_NAMES)}
+TYPES = {name: i for i, name in enumerate(TYPE_NAMES)}
+
+# Castling rights
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+FEN_CASTLING = {'K': WHITE_KINGSIDE, 'Q': WHITE_QUEENSIDE, 'k': BLACK_KINGSIDE, 'q': BLACK_QUEENSIDE}
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Move flags
+NORMAL, CASTLE, EN_PASSANT = 0, 1, 2
+
+FULL = (1 << 64) - 1
+FILE_A = sum(1 << (row * 8) for row in range(8))
+FILE_H = FILE_A << 7
+
+
+def square(row, col):
+    return row * 8 + col
+
+
+def row_col(sq):
+    return divmod(sq, 8)
+
+
+def encode_move(frm, to, promo=0, flag=NORMAL):
+    """Pack a move into an int: from | to << 6 | promotion << 12 | flag << 15"""
+    return frm | (to << 6) | (promo << 12) | (flag << 15)
+
+
+def move_from(move):
+    return move & 63
+
+
+def move_to(move):
+    return (move >> 6) & 63
+
+
+def move_promo(move):
+    return (move >> 12) & 7
+
+
+def move_flag(move):
+    return move >> 15
+
+
+def square_name(sq):
+    row, col = row_col(sq)
+    return 'abcdefgh'[col] + str(8 - row)
+
+
+def parse_square(name):
+    return square(8 - int(name[1]), 'abcdefgh'.index(name[0]))
+
+
+def move_to_uci(move):
+    text = square_name(move_from(move)) + square_name(move_to(move))
+    if move_promo(move):
+        text += 'pnbrqk'[move_promo(move)]
+    return text
+
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    return bb.bit_length() - 1
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = row_col(sq)
+        bb = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << square(r, c)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_ATTACKS = _leaper_table([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc])
+# White pawns move up the screen (towards row 0), black pawns down
+PAWN_ATTACKS = (_leaper_table([(-1, -1), (-1, 1)]), _leaper_table([(1, -1), (1, 1)]))
+
+# Sliding directions; the first four increase the square index along the ray
+ROOK_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(64):
+        row, col = row_col(sq)
+        bb = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            bb |= 1 << square(r, c)
+            r += dr
+            c += dc
+        table.append(bb)
+    return table
+
+
+# (ray table, True if the ray runs towards higher square indexes)
+ROOK_RAYS = [(_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in BISHOP_DIRECTIONS]
+
+
+def _slider_attacks(rays, sq, occupied):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            blocker = lsb(blockers) if positive else msb(blockers)
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def _between_table():
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = row_col(sq)
+        for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            between = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                table[sq][square(r, c)] = between
+                between |= 1 << square(r, c)
+                r += dr
+                c += dc
+    return table
+
+
+# Squares strictly between two squares sharing a rank, file or diagonal
+BETWEEN = _between_table()
+
+
+def rook_attacks(sq, occupied):
+    return _slider_attacks(ROOK_RAYS, sq, occupied)
+
+
+def bishop_attacks(sq, occupied):
+    return _slider_attacks(BISHOP_RAYS, sq, occupied)
+
+
+def queen_attacks(sq, occupied):
+    return _slider_attacks(ROOK_RAYS, sq, occupied) | _slider_attacks(BISHOP_RAYS, sq, occupied)
+
+
+# King destination -> (rook from, rook to) for castling moves
+CASTLE_ROOK_MOVES = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Castling rights that survive a move touching each square
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[60] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLE_MASK[63] &= ~WHITE_KINGSIDE
+CASTLE_MASK[56] &= ~WHITE_QUEENSIDE
+CASTLE_MASK[4] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLE_MASK[7] &= ~BLACK_KINGSIDE
+CASTLE_MASK[0] &= ~BLACK_QUEENSIDE
+
+PROMOTION_ROWS = (0, 7)
+START_ROWS = (6, 1)
+
+# Zobrist keys; a fixed seed keeps hashes stable across processes
+_rng = random.Random(0x5EED)
+PIECE_KEYS = [[[_rng.getrandbits(64) for _ in range(64)] for _ in range(6)] for _ in range(2)]
+CASTLE_KEYS = [_rng.getrandbits(64) for _ in range(16)]
+EP_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+SIDE_KEY = _rng.getrandbits(64)
+
+
+class Position:
+    """Chess position stored as one 64-bit integer per piece type and color"""
+
+    __slots__ = ('pieces', 'occupied', 'squares', 'kings', 'attack_maps', 'side', 'castling', 'ep', 'halfmove',
+                 'fullmove', 'hash', 'history')
+
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        # Mailbox of (color, type) or None, for O(1) piece lookup by square
+        self.squares = [None] * 64
+        self.kings = [-1, -1]
+        # Squares attacked by each side; None until requested after a move
+        self.attack_maps = [None, None]
+        self.side = WHITE
+        self.castling = 0
+        self.ep = -1
+        self.halfmove = 0
+        self.fullmove = 1
+        # Zobrist hash of pieces, side to move, castling rights and en passant file
+        self.hash = CASTLE_KEYS[0]
+        self.history = []
+
+    @classmethod
+    def from_fen(cls, fen=START_FEN):
+        pos = cls()
+        fields = fen.split()
+        for row, rank in enumerate(fields[0].split('/')):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                pos.put(square(row, col), WHITE if char.isupper() else BLACK, 'pnbrqk'.index(char.lower()))
+                col += 1
+        pos.set_side(WHITE if fields[1] == 'w' else BLACK)
+        castling = 0
+        for char in fields[2]:
+            castling |= FEN_CASTLING.get(char, 0)
+        pos.set_castling(castling)
+        if fields[3] != '-':
+            pos.set_ep(parse_square(fields[3]))
+        if len(fields) > 5:
+            pos.halfmove = int(fields[4])
+            pos.fullmove = int(fields[5])
+        return pos
+
+    def fen(self):
+        ranks = []
+        for row in range(8):
+            rank = ''
+            empty = 0
+            for col in range(8):
+                piece = self.squares[square(row, col)]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                char = 'pnbrqk'[piece[1]]
+                rank += char.upper() if piece[0] == WHITE else char
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = ''.join(char for char, right in FEN_CASTLING.items() if self.castling & right) or '-'
+        ep = square_name(self.ep) if self.ep >= 0 else '-'
+        return f"{'/'.join(ranks)} {'wb'[self.side]} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def ply(self):
+        """Half-moves played since the start of the game, from the fullmove counter"""
+        return (self.fullmove - 1) * 2 + self.side
+
+    def set_side(self, color):
+        if color != self.side:
+            self.hash ^= SIDE_KEY
+        self.side = color
+
+    def set_castling(self, castling):
+        self.hash ^= CASTLE_KEYS[self.castling] ^ CASTLE_KEYS[castling]
+        self.castling = castling
+
+    def set_ep(self, ep):
+        if self.ep >= 0:
+            self.hash ^= EP_KEYS[self.ep & 7]
+        if ep >= 0:
+            self.hash ^= EP_KEYS[ep & 7]
+        self.ep = ep
+
+    def compute_hash(self):
+        """Zobrist hash rebuilt from scratch, for checking the incremental one"""
+        key = CASTLE_KEYS[self.castling]
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                key ^= PIECE_KEYS[piece[0]][piece[1]][sq]
+        if self.ep >= 0:
+            key ^= EP_KEYS[self.ep & 7]
+        if self.side == BLACK:
+            key ^= SIDE_KEY
+        return key
+
+    def repetition_count(self):
+        """Times the current position has occurred in this game, including now"""
+        count = 1
+        # Only positions since the last capture or pawn move with the same side to move can match
+        limit = min(self.halfmove, len(self.history))
+        for back in range(2, limit + 1, 2):
+            if self.history[-back][6] == self.hash:
+                count += 1
+        return count
+
+    def trim_history(self):
+        """Forget moves before the last capture or pawn move, which no later position can repeat.
+
+        Keeps a long-lived position small; the trimmed moves can no longer be unmade.
+        """
+        excess = len(self.history) - self.halfmove
+        if excess > 0:
+            del self.history[:excess]
+
+    def put(self, sq, color, ptype):
+        bit = 1 << sq
+        self.pieces[color][ptype] |= bit
+        self.occupied[color] |= bit
+        self.squares[sq] = (color, ptype)
+        self.hash ^= PIECE_KEYS[color][ptype][sq]
+        if ptype == KING:
+            self.kings[color] = sq
+
+    def remove(self, sq):
+        color, ptype = self.squares[sq]
+        bit = 1 << sq
+        self.pieces[color][ptype] ^= bit
+        self.occupied[color] ^= bit
+        self.squares[sq] = None
+        self.hash ^= PIECE_KEYS[color][ptype][sq]
+
+    def piece_at(self, sq):
+        return self.squares[sq]
+
+    def king_square(self, color):
+        return self.kings[color]
+
+    def attackers_to(self, sq, by_color, occupied):
+        """Bitboard of by_color pieces attacking the square"""
+        theirs = self.pieces[by_color]
+        return ((PAWN_ATTACKS[by_color ^ 1][sq] & theirs[PAWN])
+                | (KNIGHT_ATTACKS[sq] & theirs[KNIGHT])
+                | (KING_ATTACKS[sq] & theirs[KING])
+                | (bishop_attacks(sq, occupied) & (theirs[BISHOP] | theirs[QUEEN]))
+                | (rook_attacks(sq, occupied) & (theirs[ROOK] | theirs[QUEEN])))
+
+    def is_attacked(self, sq, by_color):
+        """True if any piece of by_color attacks the square"""
+        attack_map = self.attack_maps[by_color]
+        if attack_map is not None:
+            return bool(attack_map & (1 << sq))
+        return bool(self.attackers_to(sq, by_color, self.occupied[WHITE] | self.occupied[BLACK]))
+
+    def attacks(self, color):
+        """Every square attacked by color.
+
+        Not updated incrementally: built on first use after a move, cached for
+        the rest of that position and restored from history by unmake_move.
+        Only king moves and castling need the whole map; single-square tests
+        go through attackers_to().
+        """
+        attack_map = self.attack_maps[color]
+        if attack_map is None:
+            attack_map = self.attack_maps[color] = self._compute_attacks(color)
+        return attack_map
+
+    def _compute_attacks(self, color):
+        ours = self.pieces[color]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        pawns = ours[PAWN]
+        if color == WHITE:
+            attack_map = ((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)
+        else:
+            attack_map = (((pawns & ~FILE_A) << 7) | ((pawns & ~FILE_H) << 9)) & FULL
+        for sq in iter_bits(ours[KNIGHT]):
+            attack_map |= KNIGHT_ATTACKS[sq]
+        for sq in iter_bits(ours[BISHOP] | ours[QUEEN]):
+            attack_map |= bishop_attacks(sq, occupied)
+        for sq in iter_bits(ours[ROOK] | ours[QUEEN]):
+            attack_map |= rook_attacks(sq, occupied)
+        if self.kings[color] >= 0:
+            attack_map |= KING_ATTACKS[self.kings[color]]
+        return attack_map
+
+    def in_check(self, color=None):
+        if color is None:
+            color = self.side
+        king_sq = self.kings[color]
+        return king_sq >= 0 and self.is_attacked(king_sq, color ^ 1)
+
+    def pseudo_legal_moves(self, from_sq=None):
+        """Moves that obey piece movement but may leave the own king in check"""
+        us = self.side
+        them = us ^ 1
+        ours = self.pieces[us]
+        own = self.occupied[us]
+        enemy = self.occupied[them]
+        occupied = own | enemy
+        empty = ~occupied & FULL
+        only = FULL if from_sq is None else 1 << from_sq
+        moves = []
+
+        forward = -8 if us == WHITE else 8
+        for frm in iter_bits(ours[PAWN] & only):
+            row = frm >> 3
+            targets = PAWN_ATTACKS[us][frm] & enemy
+            one = frm + forward
+            if (1 << one) & empty:
+                targets |= 1 << one
+                if row == START_ROWS[us] and (1 << (one + forward)) & empty:
+                    targets |= 1 << (one + forward)
+            for to in iter_bits(targets):
+                if to >> 3 == PROMOTION_ROWS[us]:
+                    for promo in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        moves.append(encode_move(frm, to, promo))
+                else:
+                    moves.append(encode_move(frm, to))
+            if self.ep >= 0 and PAWN_ATTACKS[us][frm] & (1 << self.ep):
+                moves.append(encode_move(frm, self.ep, 0, EN_PASSANT))
+
+        for frm in iter_bits(ours[KNIGHT] & only):
+            for to in iter_bits(KNIGHT_ATTACKS[frm] & ~own):
+                moves.append(encode_move(frm, to))
+        for frm in iter_bits(ours[BISHOP] & only):
+            for to in iter_bits(bishop_attacks(frm, occupied) & ~own):
+                moves.append(encode_move(frm, to))
+        for frm in iter_bits(ours[ROOK] & only):
+            for to in iter_bits(rook_attacks(frm, occupied) & ~own):
+                moves.append(encode_move(frm, to))
+        for frm in iter_bits(ours[QUEEN] & only):
+            for to in iter_bits(queen_attacks(frm, occupied) & ~own):
+                moves.append(encode_move(frm, to))
+        for frm in iter_bits(ours[KING] & only):
+            for to in iter_bits(KING_ATTACKS[frm] & ~own):
+                moves.append(encode_move(frm, to))
+            self._castling_moves(frm, occupied, moves)
+        return moves
+
+    def _castling_moves(self, king_sq, occupied, moves):
+        us = self.side
+        them = us ^ 1
+        if us == WHITE:
+            rights = ((WHITE_KINGSIDE, 62, (61, 62)), (WHITE_QUEENSIDE, 58, (57, 58, 59)))
+        else:
+            rights = ((BLACK_KINGSIDE, 6, (5, 6)), (BLACK_QUEENSIDE, 2, (1, 2, 3)))
+        if king_sq != (60 if us == WHITE else 4) or not self.castling & (rights[0][0] | rights[1][0]):
+            return
+        enemy_attacks = self.attacks(them)
+        if enemy_attacks & (1 << king_sq):
+            return
+        for right, to, between in rights:
+            if not self.castling & right:
+                continue
+            if any(occupied & (1 << sq) for sq in between):
+                continue
+            # The king may not pass through or land on an attacked square
+            step = (king_sq + to) // 2
+            if enemy_attacks & ((1 << step) | (1 << to)):
+                continue
+            moves.append(encode_move(king_sq, to, 0, CASTLE))
+
+    def pins(self, color):
+        """Map each pinned piece of color to the ray it may still move along"""
+        king_sq = self.kings[color]
+        them = color ^ 1
+        theirs = self.pieces[them]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        enemy = self.occupied[them]
+        snipers = ((rook_attacks(king_sq, enemy) & (theirs[ROOK] | theirs[QUEEN]))
+                   | (bishop_attacks(king_sq, enemy) & (theirs[BISHOP] | theirs[QUEEN])))
+        pinned = {}
+        for sniper in iter_bits(snipers):
+            between = BETWEEN[king_sq][sniper]
+            blockers = between & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & self.occupied[color]:
+                pinned[lsb(blockers)] = between | (1 << sniper)
+        return pinned
+
+    def legal_moves(self, from_sq=None):
+        """Filter pseudo-legal moves with the check and pin masks, without make/unmake"""
+        us = self.side
+        them = us ^ 1
+        king_sq = self.kings[us]
+        moves = self.pseudo_legal_moves(from_sq)
+        if king_sq < 0:
+            return moves
+
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        king_bit = 1 << king_sq
+        checkers = self.attackers_to(king_sq, them, occupied)
+        double_check = checkers & (checkers - 1)
+        check_mask = FULL
+        king_danger = self.attacks(them)
+        if checkers:
+            check_mask = 0 if double_check else checkers | BETWEEN[king_sq][lsb(checkers)]
+            # Squares behind the king on a checking line stay attacked once it steps away
+            theirs = self.pieces[them]
+            occupied_without_king = occupied ^ king_bit
+            for checker in iter_bits(checkers & (theirs[BISHOP] | theirs[QUEEN])):
+                king_danger |= bishop_attacks(checker, occupied_without_king)
+            for checker in iter_bits(checkers & (theirs[ROOK] | theirs[QUEEN])):
+                king_danger |= rook_attacks(checker, occupied_without_king)
+        pinned = self.pins(us)
+
+        legal = []
+        for move in moves:
+            frm = move & 63
+            to = (move >> 6) & 63
+            if frm == king_sq:
+                if move >> 15 == CASTLE or not king_danger & (1 << to):
+                    legal.append(move)
+            elif move >> 15 == EN_PASSANT:
+                # Removing two pawns from one rank can uncover a check; test it directly
+                self.make_move(move)
+                if not self.in_check(us):
+                    legal.append(move)
+                self.unmake_move()
+            elif check_mask & (1 << to) and (frm not in pinned or pinned[frm] & (1 << to)):
+                legal.append(move)
+        return legal
+
+    def make_move(self, move):
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = (move >> 12) & 7
+        flag = move >> 15
+        us = self.side
+        color, ptype = self.squares[frm]
+
+        captured_sq = to
+        if flag == EN_PASSANT:
+            captured_sq = to + (8 if us == WHITE else -8)
+        captured = self.squares[captured_sq]
+        self.history.append((move, captured, self.castling, self.ep, self.halfmove, self.attack_maps, self.hash))
+        self.attack_maps = [None, None]
+
+        if captured:
+            self.remove(captured_sq)
+        self.remove(frm)
+        self.put(to, us, promo or ptype)
+        if flag == CASTLE:
+            rook_from, rook_to = CASTLE_ROOK_MOVES[to]
+            self.remove(rook_from)
+            self.put(rook_to, us, ROOK)
+
+        self.set_castling(self.castling & CASTLE_MASK[frm] & CASTLE_MASK[to])
+        self.set_ep((frm + to) // 2 if ptype == PAWN and abs(to - frm) == 16 else -1)
+        self.halfmove = 0 if captured or ptype == PAWN else self.halfmove + 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = us ^ 1
+        self.hash ^= SIDE_KEY
+
+    def unmake_move(self):
+        move, captured, self.castling, self.ep, self.halfmove, self.attack_maps, saved_hash = self.history.pop()
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = (move >> 12) & 7
+        flag = move >> 15
+        self.side ^= 1
+        us = self.side
+        if us == BLACK:
+            self.fullmove -= 1
+
+        ptype = PAWN if promo else self.squares[to][1]
+        self.remove(to)
+        self.put(frm, us, ptype)
+        if flag == CASTLE:
+            rook_from, rook_to = CASTLE_ROOK_MOVES[to]
+            self.remove(rook_to)
+            self.put(rook_from, us, ROOK)
+        if captured:
+            captured_sq = to
+            if flag == EN_PASSANT:
+                captured_sq = to + (8 if us == WHITE else -8)
+            self.put(captured_sq, captured[0], captured[1])
+        self.hash = saved_hash
@@ -1,232 +1,218 @@
 import pygame
+import os
 import sys
 import socket
 import threading
+import time
+
+import handinput
+import protocol
+from bitboard import COLOR_NAMES, TYPE_NAMES, TYPES, row_col
+from game import Game
+from movecache import LegalMoveCache
+from renderer import BoardRenderer
+from sprites import SpriteAtlas
+from ttable import TranspositionTable
 
-pygame.init()
 # Constants
 WIDTH, HEIGHT = 800, 800
 SQUARE_SIZE = WIDTH // 8
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-BROWN = (139, 69, 19)
-YELLOW = (255, 255, 0)
+# Frame-rate cap; the loop sleeps in pygame.event.wait() while nothing happens
+FPS = int(os.environ.get('CHESS_FPS', 30))
+# Set to take moves straight from the hand tracker (chess_hand.py) on this UDP port
+HAND_PORT = os.environ.get('CHESS_HAND_PORT')
 
 # Network
 client_socket = None
+# Frames from the server, read by connect_to_server() then listen_for_opponent()
+incoming = None
 player_color = None
 your_turn = False
-
-# Pygame setup
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Multiplayer Chess")
-
-class ChessPiece:
-    def __init__(self, color, type, image):
-        self.color = color
-        self.type = type
-        self.image = pygame.image.load(image)
-        self.image = pygame.transform.scale(self.image, (SQUARE_SIZE, SQUARE_SIZE))
-        self.has_moved = False
-
-board = [[None for _ in range(8)] for _ in range(8)]
-current_player = 'white'
-
+# From START; lets listen_for_opponent() resume the game after a dropped connection
+room_id = None
+session_token = None
+RECONNECT_ATTEMPTS = 8
+
+# Created by init_display() so importing this module does not open a window
+screen = None
+sprites = None
+renderer = None
+# Posted by the network thread so moves are applied on the main thread
+OPPONENT_MOVE = pygame.USEREVENT + 1
+SERVER_STATE = pygame.USEREVENT + 2
+SERVER_SNAPSHOT = pygame.USEREVENT + 3
+HAND_EVENT = pygame.USEREVENT + 4
+
+game = Game(move_cache=LegalMoveCache(), status_table=TranspositionTable(size_bits=12))
+
+# (color, type) of the selected piece
 selected_piece = None
 selected_pos = None
 
 checked_king_pos = None
+# Game.status() once the game has ended, shown in the window title; no more moves are taken
+game_result = None
 promotion_pending = False
 promotion_position = None
 promotion_color = None
+promotion_from = None
+
+# Fingertip position on the board in pixels, and whether a pinch is holding the selected piece
+hand_pos = None
+hand_holding = False
+
+def init_display():
+    global screen, sprites, renderer
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Multiplayer Chess")
+    sprites = SpriteAtlas('images', SQUARE_SIZE)
+    renderer = BoardRenderer(screen, sprites, SQUARE_SIZE)
+    # Hovering changes nothing on screen, so don't wake the loop for it
+    pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+def receive_frames():
+    """Yield (type, payload) frames from the server until the connection closes"""
+    decoder = protocol.FrameDecoder()
+    while True:
+        data = client_socket.recv(4096)
+        if not data:
+            return
+        yield from decoder.feed(data)
 
-def connect_to_server():
-    global client_socket, player_color, your_turn
+def open_connection(first_frame):
+    global client_socket, incoming
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     client_socket.connect(('localhost', 5555))  # Change to server IP if needed
+    client_socket.send(first_frame)
+    incoming = receive_frames()
+
+def connect_to_server():
+    global player_color, your_turn, room_id, session_token
     room_id = input("Enter room ID to join: ")
-    client_socket.send(room_id.encode())
-
-    status = client_socket.recv(1024).decode()
-    if status == "WAIT":
-        print("Waiting for opponent...")
-        status = client_socket.recv(1024).decode()
-
-    if status == "START_WHITE":
-        print("Game started! You are White.")
-        player_color = 'white'
-        your_turn = True
-    elif status == "START_BLACK":
-        print("Game started! You are Black.")
-        player_color = 'black'
-        your_turn = False
+    open_connection(protocol.join_frame(room_id))
+
+    for msg_type, payload in incoming:
+        if msg_type == protocol.WAIT:
+            print("Waiting for opponent...")
+        elif msg_type == protocol.START:
+            player_color = COLOR_NAMES[payload[0]]
+            session_token = payload[1:]
+            your_turn = player_color == 'white'
+            print(f"Game started! You are {player_color.capitalize()}.")
+            return
+        elif msg_type == protocol.FULL:
+            print("That room already has two players.")
+            sys.exit()
+        elif msg_type == protocol.ERROR:
+            print(f"Server error: {payload.decode()}")
+            sys.exit()
+    print("Server closed the connection.")
+    sys.exit()
 
 def listen_for_opponent():
-    global your_turn, current_player
     while True:
         try:
-            data = client_socket.recv(1024).decode()
-            if data:
-                parts = list(map(int, data.split(',')))
-                from_r, from_c, to_r, to_c = parts
-                piece = board[from_r][from_c]
-                board[to_r][to_c] = piece
-                board[from_r][from_c] = None
-                piece.has_moved = True
-                current_player = player_color
-                your_turn = True
-        except:
-            break
-
-def init_board():
-    for col in range(8):
-        board[1][col] = ChessPiece('black', 'pawn', 'images/black_pawn.png')
-        board[6][col] = ChessPiece('white', 'pawn', 'images/white_pawn.png')
-    board[0][0] = board[0][7] = ChessPiece('black', 'rook', 'images/black_rook.png')
-    board[7][0] = board[7][7] = ChessPiece('white', 'rook', 'images/white_rook.png')
-    board[0][1] = board[0][6] = ChessPiece('black', 'knight', 'images/black_knight.png')
-    board[7][1] = board[7][6] = ChessPiece('white', 'knight', 'images/white_knight.png')
-    board[0][2] = board[0][5] = ChessPiece('black', 'bishop', 'images/black_bishop.png')
-    board[7][2] = board[7][5] = ChessPiece('white', 'bishop', 'images/white_bishop.png')
-    board[0][3] = ChessPiece('black', 'queen', 'images/black_queen.png')
-    board[7][3] = ChessPiece('white', 'queen', 'images/white_queen.png')
-    board[0][4] = ChessPiece('black', 'king', 'images/black_king.png')
-    board[7][4] = ChessPiece('white', 'king', 'images/white_king.png')
-
-def draw_board():
-    for row in range(8):
-        for col in range(8):
-            color = WHITE if (row + col) % 2 == 0 else BROWN
-            pygame.draw.rect(screen, color, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    if checked_king_pos:
-        pygame.draw.rect(screen, (255, 0, 0), (
-            checked_king_pos[1] * SQUARE_SIZE,
-            checked_king_pos[0] * SQUARE_SIZE,
-            SQUARE_SIZE, SQUARE_SIZE
-        ))
-    if selected_pos:
-        pygame.draw.rect(screen, YELLOW, (
-            selected_pos[1] * SQUARE_SIZE,
-            selected_pos[0] * SQUARE_SIZE,
-            SQUARE_SIZE, SQUARE_SIZE
-        ))
-    if selected_piece:
-        moves = get_legal_moves(selected_piece, selected_pos[0], selected_pos[1])
-        for move in moves:
-            center = (move[1] * SQUARE_SIZE + SQUARE_SIZE // 2, move[0] * SQUARE_SIZE + SQUARE_SIZE // 2)
-            pygame.draw.circle(screen, (0, 255, 0), center, 10)
-
-def draw_piece():
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece:
-                screen.blit(piece.image, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-
-def get_valid_moves(piece, row, col):
-    moves = []
-    direction = -1 if piece.color == 'white' else 1
-    if piece.type == 'pawn':
-        if 0 <= row + direction < 8 and board[row + direction][col] is None:
-            moves.append((row + direction, col))
-            if (piece.color == 'white' and row == 6) or (piece.color == 'black' and row == 1):
-                if board[row + 2 * direction][col] is None:
-                    moves.append((row + 2 * direction, col))
-        for dc in [-1, 1]:
-            if 0 <= row + direction < 8 and 0 <= col + dc < 8:
-                if board[row + direction][col + dc] and board[row + direction][col + dc].color != piece.color:
-                    moves.append((row + direction, col + dc))
-    elif piece.type in ['rook', 'bishop', 'queen']:
-        directions = []
-        if piece.type in ['rook', 'queen']:
-            directions += [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        if piece.type in ['bishop', 'queen']:
-            directions += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c] is None:
-                    moves.append((r, c))
-                elif board[r][c].color != piece.color:
-                    moves.append((r, c))
-                    break
-                else:
-                    break
-                r += dr
-                c += dc
-    elif piece.type == 'knight':
-        for dr, dc in [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]:
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8 and (board[r][c] is None or board[r][c].color != piece.color):
-                moves.append((r, c))
-    elif piece.type == 'king':
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                r, c = row + dr, col + dc
-                if 0 <= r < 8 and 0 <= c < 8 and (board[r][c] is None or board[r][c].color != piece.color):
-                    moves.append((r, c))
-    return moves
+            for msg_type, payload in incoming:
+                if msg_type == protocol.MOVE:
+                    from_sq, to_sq, promo = protocol.decode_move(payload)
+                    pygame.event.post(pygame.event.Event(OPPONENT_MOVE, from_sq=from_sq, to_sq=to_sq, promo=promo))
+                elif msg_type == protocol.REJECT:
+                    print("Server rejected the last move; resyncing.")
+                elif msg_type == protocol.STATE:
+                    pygame.event.post(pygame.event.Event(SERVER_STATE, fen=payload.decode()))
+                elif msg_type == protocol.SNAPSHOT:
+                    _, ply, fen, moves = protocol.decode_snapshot(payload)
+                    pygame.event.post(pygame.event.Event(SERVER_SNAPSHOT, ply=ply, fen=fen, moves=moves))
+                elif msg_type == protocol.ERROR:
+                    print(f"Server error: {payload.decode()}")
+                    return
+        except (OSError, protocol.ProtocolError):
+            pass
+        if session_token is None or not reconnect():
+            print("Disconnected from the server.")
+            return
+
+def reconnect():
+    """Reopen the connection and ask to resume the game; the snapshot arrives as the first frame"""
+    for attempt in range(RECONNECT_ATTEMPTS):
+        time.sleep(min(2 ** attempt * 0.25, 5))
+        print(f"Connection lost; reconnecting (attempt {attempt + 1})...")
+        try:
+            open_connection(protocol.resume_frame(session_token, game.ply, room_id))
+            return True
+        except OSError:
+            continue
+    return False
+
+def send_move(move):
+    promo = TYPES[move.promotion] if move.promotion else 0
+    try:
+        client_socket.send(protocol.move_frame(move.from_sq, move.to_sq, promo))
+    except OSError:
+        # Played locally; the snapshot after reconnecting settles whether the server has it
+        pass
+
+def apply_opponent_move(from_sq, to_sq, promo):
+    global your_turn
+    move = game.find_move(row_col(from_sq), row_col(to_sq), TYPE_NAMES[promo] if promo else 'queen')
+    if move is None:
+        return
+    game.play(move)
+    your_turn = game.turn == player_color
+
+def apply_server_state(fen):
+    """Adopt the server's position, dropping any local selection or promotion"""
+    global your_turn, selected_piece, selected_pos
+    global promotion_pending, promotion_position, promotion_color, promotion_from
+    game.load(fen)
+    your_turn = game.turn == player_color
+    selected_piece = selected_pos = None
+    promotion_pending = False
+    promotion_position = promotion_color = promotion_from = None
+
+def apply_snapshot(ply, fen, moves):
+    """Catch up after a reconnect by playing the missed moves, or adopt the FEN if they don't fit"""
+    global your_turn
+    if ply <= game.ply <= ply + len(moves):
+        for from_sq, to_sq, promo in moves[game.ply - ply:]:
+            apply_opponent_move(from_sq, to_sq, promo)
+    if game.fen() != fen:
+        apply_server_state(fen)
+    your_turn = game.turn == player_color
+
+def move_targets(moves):
+    """Distinct (row, col) destinations of moves, in generation order"""
+    targets = []
+    for move in moves:
+        if move.to_pos not in targets:
+            targets.append(move.to_pos)
+    return targets
 
 def get_legal_moves(piece, row, col):
-    legal_moves = []
-    possible_moves = get_valid_moves(piece, row, col)
-    for move in possible_moves:
-        r2, c2 = move
-        captured = board[r2][c2]
-        board[r2][c2] = piece
-        board[row][col] = None
-        if not is_check(piece.color):
-            legal_moves.append(move)
-        board[row][col] = piece
-        board[r2][c2] = captured
-    return legal_moves
-
-def is_check(color):
-    global checked_king_pos
-    king_pos = None
-    for r in range(8):
-        for c in range(8):
-            piece = board[r][c]
-            if piece and piece.color == color and piece.type == 'king':
-                king_pos = (r, c)
-                break
-        if king_pos:
-            break
-    for r in range(8):
-        for c in range(8):
-            piece = board[r][c]
-            if piece and piece.color != color:
-                if king_pos in get_valid_moves(piece, r, c):
-                    checked_king_pos = king_pos
-                    return True
-    checked_king_pos = None
-    return False
+    return move_targets(game.legal_moves((row, col)))
 
-def is_game_over():
-    for r in range(8):
-        for c in range(8):
-            piece = board[r][c]
-            if piece and piece.color == current_player:
-                if get_legal_moves(piece, r, c):
-                    return False
-    return True
-
-def draw_promotion_options(color):
-    options = ['queen', 'rook', 'bishop', 'knight']
-    for i, piece_type in enumerate(options):
-        img = pygame.image.load(f'images/{color}_{piece_type}.png')
-        img = pygame.transform.scale(img, (SQUARE_SIZE, SQUARE_SIZE))
-        screen.blit(img, (i * SQUARE_SIZE + 2 * SQUARE_SIZE, 3.5 * SQUARE_SIZE))
+def update_result():
+    """Check for the end of the game after a move and put the outcome in the window title"""
+    global game_result
+    status = game.status()
+    if status == game_result:
+        return
+    game_result = status
+    if status is None:
+        caption = "Multiplayer Chess"
+    elif status == 'checkmate':
+        winner = 'black' if game.turn == 'white' else 'white'
+        caption = f"Checkmate - {winner.capitalize()} wins"
+    else:
+        caption = f"Draw by {status}"
+    pygame.display.set_caption(caption)
 
 def handle_click(pos):
-    global selected_piece, selected_pos, current_player
-    global promotion_pending, promotion_position, promotion_color, your_turn
+    global selected_piece, selected_pos
+    global promotion_pending, promotion_position, promotion_color, promotion_from, your_turn
 
-    if not your_turn or promotion_pending:
+    if not your_turn or game_result:
         return
 
     col = pos[0] // SQUARE_SIZE
@@ -238,61 +224,112 @@ def handle_click(pos):
         if 0 <= option_index < 4 and 3.5 * SQUARE_SIZE <= pos[1] <= 4.5 * SQUARE_SIZE:
             piece_types = ['queen', 'rook', 'bishop', 'knight']
             selected_type = piece_types[option_index]
-            r, c = promotion_position
-            board[r][c] = ChessPiece(promotion_color, selected_type, f'images/{promotion_color}_{selected_type}.png')
+            move = game.find_move(promotion_from, promotion_position, selected_type)
+            send_move(move)
+            game.play(move)
             promotion_pending = False
             promotion_position = None
             promotion_color = None
-            current_player = 'black' if current_player == 'white' else 'white'
+            promotion_from = None
             your_turn = False
         return
 
     if selected_piece is None:
-        piece = board[row][col]
-        if piece and piece.color == current_player:
+        piece = game.piece_at(row, col)
+        if piece and piece[0] == game.turn:
             selected_piece = piece
             selected_pos = (row, col)
     else:
-        if (row, col) in get_legal_moves(selected_piece, selected_pos[0], selected_pos[1]):
-            board[row][col] = selected_piece
-            board[selected_pos[0]][selected_pos[1]] = None
-            selected_piece.has_moved = True
-
-            move_data = f"{selected_pos[0]},{selected_pos[1]},{row},{col}"
-            client_socket.send(move_data.encode())
-
-            if selected_piece.type == 'pawn' and (row == 0 or row == 7):
+        move = game.find_move(selected_pos, (row, col))
+        if move is not None:
+            if move.promotion:
+                # The move is sent and played once the promotion piece has been picked
                 promotion_pending = True
                 promotion_position = (row, col)
-                promotion_color = selected_piece.color
+                promotion_color = selected_piece[0]
+                promotion_from = selected_pos
                 selected_piece = None
                 selected_pos = None
                 return
 
-            current_player = 'black' if current_player == 'white' else 'white'
+            send_move(move)
+            game.play(move)
             your_turn = False
         selected_piece = None
         selected_pos = None
 
+def listen_for_hand(port):
+    """Forward hand tracker events to the main thread"""
+    try:
+        for kind, x, y in handinput.receive_events(port):
+            # Board units to pixels, kept on the board
+            pos = (min(max(int(x * WIDTH), 0), WIDTH - 1), min(max(int(y * HEIGHT), 0), HEIGHT - 1))
+            pygame.event.post(pygame.event.Event(HAND_EVENT, kind=kind, pos=pos))
+    except OSError as e:
+        print(f"Hand input disabled: cannot listen on UDP port {port}: {e}")
+
+def handle_hand_event(kind, pos):
+    """Pinch picks a piece up, releasing puts it down; open palm cancels; two fingers pick a promotion"""
+    global hand_pos, hand_holding, selected_piece, selected_pos
+    global promotion_pending, promotion_position, promotion_color, promotion_from
+    hand_pos = pos
+    if kind == handinput.PICK_UP and not promotion_pending and not hand_holding:
+        # Picks up the piece under the fingertip, or acts like a second click if one is already selected
+        handle_click(pos)
+        hand_holding = selected_piece is not None
+    elif kind == handinput.DROP and hand_holding:
+        hand_holding = False
+        handle_click(pos)
+    elif kind == handinput.PROMOTE and promotion_pending:
+        handle_click(pos)
+    elif kind == handinput.CANCEL:
+        hand_holding = False
+        selected_piece = selected_pos = None
+        # Nothing has been sent for a pending promotion yet, so it can simply be dropped
+        promotion_pending = False
+        promotion_position = promotion_color = promotion_from = None
+
+def render():
+    targets = get_legal_moves(selected_piece, selected_pos[0], selected_pos[1]) if selected_piece else ()
+    hover = (hand_pos[1] // SQUARE_SIZE, hand_pos[0] // SQUARE_SIZE) if hand_pos else None
+    dirty = renderer.render(game, selected_pos, targets, checked_king_pos,
+                            promotion_color if promotion_pending else None, hover)
+    if dirty:
+        pygame.display.update(dirty)
+
 def main():
-    init_board()
+    global checked_king_pos
+    init_display()
     connect_to_server()
     threading.Thread(target=listen_for_opponent, daemon=True).start()
+    if HAND_PORT:
+        threading.Thread(target=listen_for_hand, args=(int(HAND_PORT),), daemon=True).start()
+    clock = pygame.time.Clock()
+    render()
 
     while True:
-        for event in pygame.event.get():
+        # Block until input or an opponent move arrives, then drain the queue
+        for event in [pygame.event.wait()] + pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                handle_click(pygame.mouse.get_pos())
-
-        is_check(current_player)
-        draw_board()
-        draw_piece()
-        if promotion_pending:
-            draw_promotion_options(promotion_color)
-        pygame.display.flip()
+                handle_click(event.pos)
+            elif event.type == OPPONENT_MOVE:
+                apply_opponent_move(event.from_sq, event.to_sq, event.promo)
+            elif event.type == SERVER_STATE:
+                apply_server_state(event.fen)
+            elif event.type == SERVER_SNAPSHOT:
+                apply_snapshot(event.ply, event.fen, event.moves)
+            elif event.type == HAND_EVENT:
+                handle_hand_event(event.kind, event.pos)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+
+        checked_king_pos = game.checked_king()
+        update_result()
+        render()
+        clock.tick(FPS)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,162 @@
+# Game state engine: position, move application, legality and game over.
+# Pure Python with no pygame or socket imports, so servers, tools and tests
+# can run games without a display.
+
+import bitboard
+from movecache import LegalMoveCache
+
+
+class Move:
+    """Immutable move, wrapping the bitboard integer encoding"""
+
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        object.__setattr__(self, 'code', code)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Move is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Move is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, Move) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __repr__(self):
+        return f"Move({self.uci})"
+
+    @property
+    def from_sq(self):
+        return bitboard.move_from(self.code)
+
+    @property
+    def to_sq(self):
+        return bitboard.move_to(self.code)
+
+    @property
+    def from_pos(self):
+        return bitboard.row_col(self.from_sq)
+
+    @property
+    def to_pos(self):
+        return bitboard.row_col(self.to_sq)
+
+    @property
+    def promotion(self):
+        """Promotion piece type name, or None"""
+        promo = bitboard.move_promo(self.code)
+        return bitboard.TYPE_NAMES[promo] if promo else None
+
+    @property
+    def is_castle(self):
+        return bitboard.move_flag(self.code) == bitboard.CASTLE
+
+    @property
+    def is_en_passant(self):
+        return bitboard.move_flag(self.code) == bitboard.EN_PASSANT
+
+    @property
+    def uci(self):
+        return bitboard.move_to_uci(self.code)
+
+
+class Game:
+    """One chess game; colors and piece types are the client's names ('white', 'pawn', ...)"""
+
+    __slots__ = ('position', 'moves', 'move_cache', 'status_table')
+
+    def __init__(self, fen=bitboard.START_FEN, move_cache=None, status_table=None):
+        self.position = bitboard.Position.from_fen(fen)
+        self.moves = []
+        self.move_cache = move_cache if move_cache is not None else LegalMoveCache(max_positions=8)
+        # Optional TranspositionTable remembering which positions have legal moves
+        self.status_table = status_table
+
+    def load(self, fen):
+        """Replace the position, e.g. with an authoritative one from the server"""
+        self.position = bitboard.Position.from_fen(fen)
+        self.moves = []
+
+    @property
+    def turn(self):
+        return bitboard.COLOR_NAMES[self.position.side]
+
+    @property
+    def ply(self):
+        return self.position.ply()
+
+    def piece_at(self, row, col):
+        """(color, type) of the piece on a square, or None"""
+        piece = self.position.piece_at(bitboard.square(row, col))
+        if piece is None:
+            return None
+        return bitboard.COLOR_NAMES[piece[0]], bitboard.TYPE_NAMES[piece[1]]
+
+    def pieces(self):
+        """Yield (row, col, color, type) for every piece on the board"""
+        for sq, piece in enumerate(self.position.squares):
+            if piece is not None:
+                yield sq >> 3, sq & 7, bitboard.COLOR_NAMES[piece[0]], bitboard.TYPE_NAMES[piece[1]]
+
+    def legal_moves(self, from_pos=None):
+        if from_pos is None:
+            codes = self.move_cache.moves(self.position)
+        else:
+            codes = self.move_cache.moves_from(self.position, bitboard.square(*from_pos))
+        return [Move(code) for code in codes]
+
+    def find_move(self, from_pos, to_pos, promotion='queen'):
+        """Legal move between two (row, col) squares, or None"""
+        to = bitboard.square(*to_pos)
+        promo = bitboard.TYPES[promotion]
+        for code in self.move_cache.moves_from(self.position, bitboard.square(*from_pos)):
+            if bitboard.move_to(code) == to and bitboard.move_promo(code) in (0, promo):
+                return Move(code)
+        return None
+
+    def is_legal(self, move):
+        return move.code in self.move_cache.moves_from(self.position, move.from_sq)
+
+    def play(self, move):
+        if not self.is_legal(move):
+            raise ValueError(f"Illegal move {move.uci} in {self.position.fen()}")
+        self.position.make_move(move.code)
+        self.moves.append(move)
+
+    def checked_king(self, color=None):
+        """(row, col) of the king if it is in check, else None"""
+        color_index = self.position.side if color is None else bitboard.COLORS[color]
+        if self.position.in_check(color_index):
+            return bitboard.row_col(self.position.king_square(color_index))
+        return None
+
+    def has_legal_moves(self):
+        key = self.position.hash
+        if self.status_table is not None:
+            cached = self.status_table.probe(key)
+            if cached is not None:
+                return cached
+        has_moves = bool(self.move_cache.moves(self.position))
+        if self.status_table is not None:
+            self.status_table.store(key, has_moves)
+        return has_moves
+
+    def status(self):
+        """'checkmate', 'stalemate', 'repetition', 'fifty-move', or None while the game goes on"""
+        if not self.has_legal_moves():
+            return 'checkmate' if self.position.in_check() else 'stalemate'
+        if self.position.repetition_count() >= 3:
+            return 'repetition'
+        if self.position.halfmove >= 100:
+            return 'fifty-move'
+        return None
+
+    def is_over(self):
+        return self.status() is not None
+
+    def fen(self):
+        return self.position.fen()
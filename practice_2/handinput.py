@@ -0,0 +1,109 @@
+# Hand tracker -> chess client events over loopback UDP.
+#
+# Each datagram is one event: a 1-byte kind, a 1-byte sender session, a 1-byte
+# sequence number and the fingertip position as two little-endian floats in
+# board units (0-1 across and down the board). The tracker sends a POINTER
+# event per frame and one event per gesture. A lost pointer datagram is simply
+# superseded by the next one. Gestures are edge-triggered and happen once, so
+# each gets a sequence number (1-255) and is sent again alongside the next few
+# events; the client drops copies it has already seen. Pointer events have
+# sequence 0. The session is random per sender, so a restarted tracker, whose
+# numbering starts over, is not mistaken for repeats of the old one.
+
+import collections
+import secrets
+import socket
+import struct
+
+HAND_PORT = 5556
+
+POINTER = 0
+PICK_UP = 1
+DROP = 2
+CANCEL = 3
+PROMOTE = 4
+
+# Gesture names from gestures.CHESS_RULES
+GESTURE_EVENTS = {'pick_up': PICK_UP, 'drop': DROP, 'cancel': CANCEL, 'promote': PROMOTE}
+
+EVENT = struct.Struct('<BBBff')
+
+# Sends of each gesture event, the first included
+GESTURE_REPEATS = 3
+# Recent gesture sequence numbers the client remembers to drop repeats
+SEEN_SEQUENCES = 32
+
+
+def encode_event(kind, x, y, sequence=0, session=0):
+    return EVENT.pack(kind, session, sequence, x, y)
+
+
+def decode_event(data):
+    """(kind, session, sequence, x, y) from a datagram, or None if it is not a hand event"""
+    if len(data) != EVENT.size:
+        return None
+    return EVENT.unpack(data)
+
+
+class HandEventSender:
+    """Tracker side: non-blocking datagrams to the client.
+
+    Nothing acknowledges delivery, so every gesture event is repeated on the
+    next GESTURE_REPEATS - 1 calls to send(). `failed` counts datagrams the
+    socket would not take; when it grows the client is probably not running.
+    """
+
+    def __init__(self, host='127.0.0.1', port=HAND_PORT, repeats=GESTURE_REPEATS):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.repeats = repeats
+        self.session = secrets.randbelow(256)
+        # [datagram, sends left] of recent gestures
+        self.pending = []
+        self.sequence = 0
+        self.failed = 0
+
+    def send(self, kind, x, y):
+        for item in self.pending:
+            self._send(item[0])
+            item[1] -= 1
+        self.pending = [item for item in self.pending if item[1] > 0]
+        if kind == POINTER:
+            self._send(encode_event(kind, x, y, session=self.session))
+            return
+        self.sequence = self.sequence % 255 + 1
+        data = encode_event(kind, x, y, self.sequence, self.session)
+        self._send(data)
+        if self.repeats > 1:
+            self.pending.append([data, self.repeats - 1])
+
+    def _send(self, data):
+        try:
+            self.sock.sendto(data, self.address)
+        except (BlockingIOError, ConnectionRefusedError):
+            self.failed += 1
+
+    def close(self):
+        self.sock.close()
+
+
+def receive_events(port=HAND_PORT):
+    """Client side: yield (kind, x, y) events forever, each gesture once; OSError if the port cannot be bound"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', port))
+    seen = collections.deque(maxlen=SEEN_SEQUENCES)
+    current_session = None
+    while True:
+        event = decode_event(sock.recv(64))
+        if event is None:
+            continue
+        kind, session, sequence, x, y = event
+        if session != current_session:
+            current_session = session
+            seen.clear()
+        if kind != POINTER:
+            if sequence in seen:
+                continue
+            seen.append(sequence)
+        yield kind, x, y
@@ -0,0 +1,224 @@
+# Load generator for server.py: simulated player pairs over loopback, playing
+# random or scripted legal games, with relay latency and server resource
+# reporting. Needs no display; runs anywhere the server does.
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import bitboard
+import protocol
+from game import Game
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.games_finished = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_threads = 0
+        self.max_rss_kb = 0
+
+
+def process_tree(pid):
+    """pid and all of its descendants, read from /proc"""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def server_usage(pid):
+    """(threads, resident KiB) summed over the server process and its shard workers"""
+    threads = rss_kb = 0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/status') as f:
+                for line in f:
+                    if line.startswith('Threads:'):
+                        threads += int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return threads, rss_kb
+
+
+def parse_uci(game, text):
+    from_pos = bitboard.row_col(bitboard.parse_square(text[:2]))
+    to_pos = bitboard.row_col(bitboard.parse_square(text[2:4]))
+    promotion = bitboard.TYPE_NAMES['pnbrqk'.index(text[4])] if len(text) > 4 else 'queen'
+    return game.find_move(from_pos, to_pos, promotion)
+
+
+async def wait_for_start(reader):
+    """Color the server assigned this connection, from its START frame"""
+    while True:
+        frame = await protocol.read_frame(reader)
+        if frame is None:
+            raise ConnectionError("closed before START")
+        if frame[0] == protocol.START:
+            return frame[1][0]
+        if frame[0] in (protocol.FULL, protocol.ERROR):
+            raise ConnectionError(f"refused with frame type {frame[0]}")
+
+
+async def read_move(reader, stats):
+    """Next MOVE frame from the server, counting rejections on the way"""
+    while True:
+        frame = await protocol.read_frame(reader)
+        if frame is None:
+            raise ConnectionError("connection closed mid-game")
+        if frame[0] == protocol.MOVE:
+            return frame[1]
+        if frame[0] == protocol.REJECT:
+            stats.rejected += 1
+            raise ConnectionError("server rejected a move")
+
+
+async def play_pair(index, args, stats, rng):
+    room_id = f"load-{os.getpid()}-{index}"
+    joined = []
+    try:
+        for _ in range(2):
+            joined.append(await asyncio.open_connection(args.host, args.port))
+            joined[-1][1].write(protocol.join_frame(room_id))
+        # Indexed by color: the server, not join order, decides who plays white
+        connections = [None, None]
+        for reader, writer in joined:
+            connections[await wait_for_start(reader)] = (reader, writer)
+
+        game = Game()
+        interval = 1 / args.rate if args.rate else 0
+        while not game.is_over() and len(game.moves) < args.max_plies:
+            if len(game.moves) < len(args.script):
+                move = parse_uci(game, args.script[len(game.moves)])
+                if move is None:
+                    raise ValueError(f"Scripted move {args.script[len(game.moves)]} is illegal")
+            else:
+                move = rng.choice(game.legal_moves())
+            mover = connections[game.position.side][1]
+            receiver = connections[game.position.side ^ 1][0]
+            if interval:
+                await asyncio.sleep(interval)
+            promo = bitboard.TYPES[move.promotion] if move.promotion else 0
+            sent = time.perf_counter()
+            mover.write(protocol.move_frame(move.from_sq, move.to_sq, promo))
+            await mover.drain()
+            await read_move(receiver, stats)
+            stats.latencies.append(time.perf_counter() - sent)
+            game.play(move)
+        stats.games_finished += 1
+    except (OSError, EOFError, protocol.ProtocolError) as e:
+        stats.dropped += 1
+        if args.verbose:
+            print(f"[DROPPED] pair {index}: {e}")
+    finally:
+        for _, writer in joined:
+            writer.close()
+
+
+async def sample_server(pid, stats, interval=0.5):
+    while True:
+        threads, rss_kb = server_usage(pid)
+        stats.max_threads = max(stats.max_threads, threads)
+        stats.max_rss_kb = max(stats.max_rss_kb, rss_kb)
+        await asyncio.sleep(interval)
+
+
+async def run_load(args, server_pid=None):
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    sampler = asyncio.create_task(sample_server(server_pid, stats)) if server_pid else None
+    start = time.perf_counter()
+    pairs = []
+    for index in range(args.pairs):
+        pairs.append(asyncio.create_task(play_pair(index, args, stats, rng)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.pairs)
+    await asyncio.gather(*pairs)
+    elapsed = time.perf_counter() - start
+    if sampler:
+        sampler.cancel()
+    return stats, elapsed
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def report(stats, elapsed, args):
+    latencies = sorted(stats.latencies)
+    moves = len(latencies)
+    print(f"Pairs: {args.pairs}  games finished: {stats.games_finished}  "
+          f"dropped: {stats.dropped}  rejected moves: {stats.rejected}")
+    print(f"Moves relayed: {moves} in {elapsed:.2f}s ({moves / elapsed if elapsed else 0:.0f} moves/s)")
+    if latencies:
+        print("Relay latency ms: " + "  ".join(
+            f"{name} {percentile(latencies, fraction) * 1000:.2f}"
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))))
+    if stats.max_threads:
+        print(f"Server peak: {stats.max_threads} threads, {stats.max_rss_kb / 1024:.1f} MiB resident")
+
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the chess relay server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--pairs', type=int, default=100, help="simulated games (two connections each)")
+    parser.add_argument('--max-plies', type=int, default=80, help="stop each game after this many moves")
+    parser.add_argument('--rate', type=float, default=0, help="moves per second per game (0 = as fast as possible)")
+    parser.add_argument('--ramp', type=float, default=0, help="seconds over which to start the pairs")
+    parser.add_argument('--script', default='', help="space-separated UCI moves every game starts with")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-pid', type=int, help="measure threads and memory of an already running server")
+    parser.add_argument('--spawn-server', action='store_true', help="start server.py on --port for the run")
+    parser.add_argument('--workers', type=int, default=1, help="--workers for a spawned server")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    args.script = args.script.split()
+
+    server = None
+    server_pid = args.server_pid
+    if args.spawn_server:
+        server = subprocess.Popen(
+            [sys.executable, 'server.py', '--host', args.host, '--port', str(args.port), '--workers', str(args.workers)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL)
+        server_pid = server.pid
+    try:
+        if server:
+            wait_for_port(args.host, args.port)
+        stats, elapsed = asyncio.run(run_load(args, server_pid))
+        report(stats, elapsed, args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
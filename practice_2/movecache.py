@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+import bitboard
+
+
+class LegalMoveCache:
+    """Legal moves per position, keyed by Zobrist hash with LRU eviction"""
+
+    def __init__(self, max_positions=64):
+        self.max_positions = max_positions
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, position):
+        key = position.hash
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        moves = position.legal_moves()
+        by_square = {}
+        for move in moves:
+            by_square.setdefault(bitboard.move_from(move), []).append(move)
+        entry = (moves, by_square)
+        self.entries[key] = entry
+        if len(self.entries) > self.max_positions:
+            self.entries.popitem(last=False)
+        return entry
+
+    def moves(self, position):
+        """All legal moves for the side to move"""
+        return self._entry(position)[0]
+
+    def moves_from(self, position, sq):
+        """Legal moves of the piece on sq"""
+        return self._entry(position)[1].get(sq, [])
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,101 @@
+import argparse
+import sys
+import time
+
+import bitboard
+
+# Standard perft positions with known node counts for depths 1, 2, 3, ...
+BENCHMARK_POSITIONS = [
+    ('startpos', bitboard.START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('promotions', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('castling-checks', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('middlegame', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(position, depth):
+    """Number of leaf nodes of the legal move tree `depth` plies deep"""
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position, depth):
+    """Perft split by root move, as a list of (uci move, node count)"""
+    results = []
+    for move in position.legal_moves():
+        position.make_move(move)
+        results.append((bitboard.move_to_uci(move), perft(position, depth - 1)))
+        position.unmake_move()
+    return results
+
+
+def timed_perft(fen, depth):
+    position = bitboard.Position.from_fen(fen)
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed
+
+
+def run_benchmark(depth):
+    """Run every benchmark position to `depth` (or its deepest known count); True if all match"""
+    all_ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, counts in BENCHMARK_POSITIONS:
+        d = min(depth, len(counts))
+        nodes, elapsed = timed_perft(fen, d)
+        ok = nodes == counts[d - 1]
+        all_ok = all_ok and ok
+        total_nodes += nodes
+        total_time += elapsed
+        print(f"{name:16} depth {d}  {nodes:>9} nodes  {elapsed:7.2f}s  "
+              f"{nodes / elapsed if elapsed else 0:>9.0f} nps  {'ok' if ok else f'FAIL (expected {counts[d - 1]})'}")
+    print(f"{'total':16}          {total_nodes:>9} nodes  {total_time:7.2f}s  "
+          f"{total_nodes / total_time if total_time else 0:>9.0f} nps")
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft node counts for the bitboard move generator")
+    parser.add_argument('--fen', default=bitboard.START_FEN, help="position to search (default: start position)")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help="print node counts per root move")
+    parser.add_argument('--bench', action='store_true', help="run the standard benchmark positions")
+    args = parser.parse_args()
+
+    if args.bench:
+        sys.exit(0 if run_benchmark(args.depth) else 1)
+
+    position = bitboard.Position.from_fen(args.fen)
+    start = time.perf_counter()
+    if args.divide:
+        results = divide(position, args.depth)
+        for move, nodes in results:
+            print(f"{move}: {nodes}")
+        nodes = sum(count for _, count in results)
+    else:
+        nodes = perft(position, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}  Time: {elapsed:.2f}s  NPS: {nodes / elapsed if elapsed else 0:.0f}")
+
+
+if __name__ == "__main__":
+    main()
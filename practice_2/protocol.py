@@ -0,0 +1,141 @@
+# Framed binary protocol shared by the client and server.
+#
+# Every message is a frame: a 2-byte big-endian length, then a 1-byte
+# message type, then (length - 1) bytes of payload. A move payload is two
+# bytes: from square | to square << 6 | promotion type << 12, using the
+# square numbering and piece type codes of bitboard.py.
+#
+# START also carries a session token. A player whose connection drops sends
+# RESUME with that token and the number of half-moves it has played, and gets
+# back a SNAPSHOT: the room's current FEN plus the moves since that ply, as
+# far back as the server's bounded move log reaches.
+
+import struct
+
+JOIN = 1    # client -> server: room id (utf-8)
+WAIT = 2    # server -> client: waiting for an opponent
+START = 3   # server -> client: 1 byte, 0 = you are white, 1 = you are black; then the session token
+MOVE = 4    # both ways: 2-byte move
+FULL = 5    # server -> client: the room already has two players
+ERROR = 6   # server -> client: utf-8 reason
+REJECT = 7  # server -> client: 2-byte move the server refused
+STATE = 8   # server -> client: authoritative position as a utf-8 FEN string
+WATCH = 9   # client -> server: room id (utf-8) to follow as a spectator
+RESUME = 10     # client -> server: session token, 2-byte ply, room id (utf-8)
+SNAPSHOT = 11   # server -> client: color, 2-byte ply of the first move, FEN length, FEN, 2-byte moves
+
+HEADER = struct.Struct('>HB')
+MOVE_STRUCT = struct.Struct('>H')
+MAX_FRAME = 4096
+TOKEN_SIZE = 16
+RESUME_STRUCT = struct.Struct(f'>{TOKEN_SIZE}sH')
+SNAPSHOT_STRUCT = struct.Struct('>BHB')
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def encode_frame(msg_type, payload=b''):
+    if len(payload) + 1 > MAX_FRAME:
+        raise ProtocolError(f"Frame of {len(payload) + 1} bytes exceeds {MAX_FRAME}")
+    return HEADER.pack(len(payload) + 1, msg_type) + payload
+
+
+def encode_move(from_sq, to_sq, promo=0):
+    return MOVE_STRUCT.pack(from_sq | (to_sq << 6) | (promo << 12))
+
+
+def decode_move(payload):
+    """(from square, to square, promotion type) from a 2-byte move payload"""
+    if len(payload) != MOVE_STRUCT.size:
+        raise ProtocolError(f"Move payload must be {MOVE_STRUCT.size} bytes, got {len(payload)}")
+    value, = MOVE_STRUCT.unpack(payload)
+    return value & 63, (value >> 6) & 63, (value >> 12) & 7
+
+
+def join_frame(room_id):
+    return encode_frame(JOIN, room_id.encode())
+
+
+def watch_frame(room_id):
+    return encode_frame(WATCH, room_id.encode())
+
+
+def start_frame(color, token=b''):
+    return encode_frame(START, bytes([color]) + token)
+
+
+def resume_frame(token, ply, room_id):
+    return encode_frame(RESUME, RESUME_STRUCT.pack(token, ply) + room_id.encode())
+
+
+def decode_resume(payload):
+    """(token, ply, room id) from a RESUME payload"""
+    if len(payload) < RESUME_STRUCT.size:
+        raise ProtocolError(f"Resume payload must be at least {RESUME_STRUCT.size} bytes, got {len(payload)}")
+    token, ply = RESUME_STRUCT.unpack_from(payload)
+    return token, ply, payload[RESUME_STRUCT.size:].decode()
+
+
+def snapshot_frame(color, ply, fen, moves=()):
+    """SNAPSHOT of a position plus already-encoded moves starting at half-move `ply`"""
+    fen = fen.encode()
+    return encode_frame(SNAPSHOT, SNAPSHOT_STRUCT.pack(color, ply, len(fen)) + fen + b''.join(moves))
+
+
+def decode_snapshot(payload):
+    """(color, ply, FEN, [(from, to, promotion), ...]) from a SNAPSHOT payload"""
+    if len(payload) < SNAPSHOT_STRUCT.size:
+        raise ProtocolError(f"Snapshot payload must be at least {SNAPSHOT_STRUCT.size} bytes, got {len(payload)}")
+    color, ply, fen_length = SNAPSHOT_STRUCT.unpack_from(payload)
+    start = SNAPSHOT_STRUCT.size + fen_length
+    fen = payload[SNAPSHOT_STRUCT.size:start].decode()
+    if (len(payload) - start) % MOVE_STRUCT.size:
+        raise ProtocolError("Snapshot move list is not a whole number of moves")
+    moves = [decode_move(payload[i:i + MOVE_STRUCT.size]) for i in range(start, len(payload), MOVE_STRUCT.size)]
+    return color, ply, fen, moves
+
+
+def move_frame(from_sq, to_sq, promo=0):
+    return encode_frame(MOVE, encode_move(from_sq, to_sq, promo))
+
+
+class FrameDecoder:
+    """Streaming decoder: feed it bytes as they arrive, get back complete frames"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Buffer data and return the list of (type, payload) frames now complete"""
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= HEADER.size:
+            length, msg_type = HEADER.unpack_from(self.buffer, offset)
+            if length == 0 or length > MAX_FRAME:
+                raise ProtocolError(f"Bad frame length {length}")
+            end = offset + 2 + length
+            if end > len(self.buffer):
+                break
+            frames.append((msg_type, bytes(self.buffer[offset + HEADER.size:end])))
+            offset = end
+        del self.buffer[:offset]
+        return frames
+
+
+async def read_frame(reader):
+    """Read one (type, payload) frame from an asyncio StreamReader; None at end of stream"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except EOFError:
+        return None
+    length, msg_type = HEADER.unpack(header)
+    if length == 0 or length > MAX_FRAME:
+        raise ProtocolError(f"Bad frame length {length}")
+    try:
+        payload = await reader.readexactly(length - 1)
+    except EOFError:
+        return None
+    return msg_type, payload
@@ -0,0 +1,119 @@
+import pygame
+
+LIGHT = (255, 255, 255)
+DARK = (139, 69, 19)
+SELECTED = (255, 255, 0)
+CHECK = (255, 0, 0)
+MOVE_DOT = (0, 255, 0)
+HOVER = (0, 160, 255)
+
+PROMOTION_OPTIONS = ('queen', 'rook', 'bishop', 'knight')
+
+# Marks a square that must be repainted whatever it should show
+UNDRAWN = object()
+
+
+class BoardRenderer:
+    """Draws the board into `screen`, repainting only squares whose contents changed.
+
+    Each call to render() builds the wanted look of every square (piece,
+    highlight, move dot) and compares it with what was last drawn; only the
+    differing squares are repainted and returned as dirty rectangles for
+    pygame.display.update().
+    """
+
+    def __init__(self, screen, sprites, square_size):
+        self.screen = screen
+        self.sprites = sprites
+        self.square_size = square_size
+        self.background = self._draw_background()
+        self.drawn = [UNDRAWN] * 64
+        self.drawn_promotion = None
+
+    def _draw_background(self):
+        size = self.square_size
+        background = pygame.Surface((size * 8, size * 8))
+        for row in range(8):
+            for col in range(8):
+                color = LIGHT if (row + col) % 2 == 0 else DARK
+                pygame.draw.rect(background, color, (col * size, row * size, size, size))
+        return background
+
+    def resize(self, square_size):
+        self.square_size = square_size
+        self.sprites.resize(square_size)
+        self.background = self._draw_background()
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a full repaint on the next render()"""
+        self.drawn = [UNDRAWN] * 64
+        self.drawn_promotion = None
+
+    def promotion_rect(self):
+        size = self.square_size
+        return pygame.Rect(2 * size, int(3.5 * size), 4 * size, size)
+
+    def render(self, game, selected_pos=None, targets=(), checked_king=None, promotion_color=None, hover=None):
+        """Repaint what changed since the last call and return the dirty rectangles"""
+        wanted = [None] * 64
+        for row, col, color, piece_type in game.pieces():
+            wanted[row * 8 + col] = (color, piece_type, None, False)
+        highlights = []
+        if hover:
+            highlights.append((hover, HOVER))
+        if checked_king:
+            highlights.append((checked_king, CHECK))
+        if selected_pos:
+            highlights.append((selected_pos, SELECTED))
+        for (row, col), highlight in highlights:
+            sq = row * 8 + col
+            piece = wanted[sq] or (None, None, None, False)
+            wanted[sq] = piece[:2] + (highlight, piece[3])
+        for row, col in targets:
+            sq = row * 8 + col
+            piece = wanted[sq] or (None, None, None, False)
+            wanted[sq] = piece[:3] + (True,)
+
+        dirty = []
+        for sq in range(64):
+            if wanted[sq] != self.drawn[sq]:
+                dirty.append(self._draw_square(sq, wanted[sq]))
+                self.drawn[sq] = wanted[sq]
+
+        overlay = self.promotion_rect()
+        if promotion_color != self.drawn_promotion or (promotion_color and overlay.collidelist(dirty) != -1):
+            if promotion_color:
+                self._draw_promotion(promotion_color)
+            else:
+                # Repaint the squares the closed picker was covering
+                for sq in range(64):
+                    rect = self._square_rect(sq)
+                    if rect.colliderect(overlay):
+                        self._draw_square(sq, self.drawn[sq])
+            dirty.append(overlay)
+            self.drawn_promotion = promotion_color
+        return dirty
+
+    def _square_rect(self, sq):
+        size = self.square_size
+        return pygame.Rect((sq & 7) * size, (sq >> 3) * size, size, size)
+
+    def _draw_square(self, sq, contents):
+        rect = self._square_rect(sq)
+        self.screen.blit(self.background, rect, rect)
+        if contents is None:
+            return rect
+        color, piece_type, highlight, dot = contents
+        if highlight:
+            pygame.draw.rect(self.screen, highlight, rect)
+        if dot:
+            pygame.draw.circle(self.screen, MOVE_DOT, rect.center, 10)
+        if piece_type:
+            self.screen.blit(self.sprites.get(color, piece_type), rect)
+        return rect
+
+    def _draw_promotion(self, color):
+        size = self.square_size
+        for i, piece_type in enumerate(PROMOTION_OPTIONS):
+            self.screen.blit(self.sprites.get(color, piece_type), (i * size + 2 * size, 3.5 * size))
@@ -1,57 +1,409 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import secrets
+import signal
 import socket
-import threading
+import zlib
+from collections import deque
+
+import bitboard
+import protocol
 
 # Server configuration
 HOST = '0.0.0.0'
 PORT = 5555
 
-# Dictionary to manage rooms and connected clients
+# Per-connection limit on bytes buffered for a slow reader
+WRITE_BUFFER_LIMIT = 64 * 1024
+# A spectator this far behind is disconnected rather than slowing the game down
+SPECTATOR_BUFFER_LIMIT = 256 * 1024
+READ_LIMIT = protocol.MAX_FRAME + protocol.HEADER.size
+
+# Sharded mode: seconds a new connection gets to send JOIN, and between load reports
+JOIN_TIMEOUT = 10
+STATS_INTERVAL = 10
+HANDOFF_SIZE = protocol.MAX_FRAME * 2
+
+# Seconds a game waits for a dropped player to resume before the room closes
+RESUME_GRACE = 60
+# Half-moves kept per room for resuming; a client further behind gets only the FEN
+MOVE_LOG_LIMIT = 64
+
+class Room:
+    """Up to two players and any number of spectators; rooms exist only while someone is connected"""
+
+    __slots__ = ('room_id', 'players', 'spectators', 'position', 'over', 'tokens', 'move_log', 'expiry')
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        # Indexed by color once the game starts; None while that player is disconnected
+        self.players = []
+        self.spectators = set()
+        # Authoritative bitboard position, created when the game starts
+        self.position = None
+        # Set once the game has ended; no further moves are accepted
+        self.over = False
+        # Session token of each color, for RESUME
+        self.tokens = []
+        # Encoded payloads of the most recent moves
+        self.move_log = deque(maxlen=MOVE_LOG_LIMIT)
+        # Timer that closes the room if a dropped player does not come back
+        self.expiry = None
+
+    def opponent(self, writer):
+        for player in self.players:
+            if player is not None and player is not writer:
+                return player
+        return None
+
+    def snapshot(self, color, ply):
+        """SNAPSHOT frame for a resuming player who has seen `ply` half-moves"""
+        current = self.position.ply()
+        first = current - len(self.move_log)
+        # Send the logged moves the client lacks when the log reaches back that far
+        skip = ply - first if first <= ply <= current else len(self.move_log)
+        moves = list(self.move_log)[skip:]
+        return protocol.snapshot_frame(color, current - len(moves), self.position.fen(), moves)
+
+    def broadcast(self, frame):
+        """Write one already-encoded frame to every spectator, dropping any that fall too far behind"""
+        for spectator in list(self.spectators):
+            if spectator.transport.get_write_buffer_size() > SPECTATOR_BUFFER_LIMIT:
+                print(f"[SLOW SPECTATOR] dropped from room '{self.room_id}'")
+                self.spectators.discard(spectator)
+                spectator.close()
+            else:
+                spectator.write(frame)
+
+# Dictionary to manage rooms and connected clients. Only touched from the
+# event loop thread, so no lock is needed.
 rooms = {}
+# Move frames relayed by this process, for load reporting
+messages_relayed = 0
+# Keeps tasks created outside asyncio.start_server from being garbage collected
+background_tasks = set()
 
-def handle_client(conn, addr):
+async def handle_client(reader, writer):
+    addr = writer.get_extra_info('peername')
+    writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_LIMIT)
     print(f"[NEW CONNECTION] {addr} connected.")
+    room = None
     try:
-        room_id = conn.recv(1024).decode()
+        frame = await protocol.read_frame(reader)
+        if frame is None:
+            return
+        msg_type, payload = frame
+        if msg_type == protocol.WATCH:
+            await watch_room(reader, writer, payload.decode())
+            return
+        if msg_type == protocol.RESUME:
+            room = resume_game(writer, *protocol.decode_resume(payload))
+            await writer.drain()
+            if room is not None:
+                await relay_messages(reader, writer, room)
+            return
+        if msg_type != protocol.JOIN:
+            writer.write(protocol.encode_frame(protocol.ERROR, b"expected JOIN"))
+            await writer.drain()
+            return
+        room_id = payload.decode()
         print(f"[ROOM JOIN] {addr} wants to join room '{room_id}'")
 
-        if room_id not in rooms:
-            rooms[room_id] = [conn]
-            conn.send("WAIT".encode())  # First player waits
+        room = rooms.get(room_id)
+        if room is None:
+            room = rooms[room_id] = Room(room_id)
+        if len(room.players) >= 2:
+            print(f"[ROOM FULL] {addr} turned away from room '{room_id}'")
+            writer.write(protocol.encode_frame(protocol.FULL))
+            await writer.drain()
+            room = None
+            return
+        room.players.append(writer)
+        if len(room.players) == 1:
+            writer.write(protocol.encode_frame(protocol.WAIT))  # First player waits
         else:
-            rooms[room_id].append(conn)
-            if len(rooms[room_id]) == 2:
-                # Notify both clients that the game is starting
-                rooms[room_id][0].send("START_WHITE".encode())
-                rooms[room_id][1].send("START_BLACK".encode())
-
-                # Start forwarding data between clients
-                threading.Thread(target=relay_messages, args=(rooms[room_id][0], rooms[room_id][1])).start()
-                threading.Thread(target=relay_messages, args=(rooms[room_id][1], rooms[room_id][0])).start()
-    except Exception as e:
+            # Notify both clients that the game is starting
+            room.position = bitboard.Position.from_fen()
+            room.tokens = [secrets.token_bytes(protocol.TOKEN_SIZE) for _ in range(2)]
+            room.players[0].write(protocol.start_frame(0, room.tokens[0]))
+            room.players[1].write(protocol.start_frame(1, room.tokens[1]))
+            room.broadcast(protocol.encode_frame(protocol.STATE, room.position.fen().encode()))
+        await writer.drain()
+
+        await relay_messages(reader, writer, room)
+    except (ConnectionError, UnicodeDecodeError, protocol.ProtocolError) as e:
         print(f"[ERROR] {addr}: {e}")
-        conn.close()
+    finally:
+        if room is not None:
+            leave_room(room, writer)
+        writer.close()
 
-def relay_messages(from_conn, to_conn):
+async def relay_messages(reader, writer, room):
+    """Check this player's moves against the room position and forward the legal ones"""
+    global messages_relayed
     while True:
-        try:
-            data = from_conn.recv(1024)
-            if not data:
-                break
-            to_conn.send(data)
-        except:
+        frame = await protocol.read_frame(reader)
+        if frame is None:
+            break
+        msg_type, payload = frame
+        if writer not in room.players:
+            # A resumed connection took this seat; ignore whatever the old one still had buffered
             break
-    from_conn.close()
-    to_conn.close()
+        if msg_type != protocol.MOVE:
+            continue
+        # A malformed payload drops the connection; an illegal move resyncs the sender
+        move = validate_move(room, writer, protocol.decode_move(payload))
+        if move is None:
+            writer.write(protocol.encode_frame(protocol.REJECT, payload))
+            writer.write(protocol.encode_frame(protocol.STATE, room.position.fen().encode()))
+            await writer.drain()
+            continue
+        room.position.make_move(move)
+        # Repetition detection only looks back to the last capture or pawn move, which
+        # game_over() keeps under 100 half-moves
+        room.position.trim_history()
+        room.over = game_over(room.position)
+        room.move_log.append(payload)
+        # Encode once; the opponent and every spectator get the same bytes
+        frame = protocol.encode_frame(msg_type, payload)
+        room.broadcast(frame)
+        opponent = room.opponent(writer)
+        if opponent is not None:
+            opponent.write(frame)
+            messages_relayed += 1
+            await opponent.drain()
+
+async def watch_room(reader, writer, room_id):
+    """Follow a room's moves, starting from a snapshot of the current position"""
+    addr = writer.get_extra_info('peername')
+    print(f"[WATCH] {addr} is watching room '{room_id}'")
+    room = rooms.get(room_id)
+    if room is None:
+        room = rooms[room_id] = Room(room_id)
+    if room.position is None:
+        writer.write(protocol.encode_frame(protocol.WAIT))
+    else:
+        writer.write(protocol.encode_frame(protocol.STATE, room.position.fen().encode()))
+    room.spectators.add(writer)
+    try:
+        # Spectators have nothing to say; reading only detects when they leave
+        while await protocol.read_frame(reader) is not None:
+            pass
+    finally:
+        room.spectators.discard(writer)
+        if not room.players and not room.spectators and rooms.get(room_id) is room:
+            del rooms[room_id]
+
+def game_over(position):
+    """True once the game has ended by mate, stalemate, threefold repetition or the fifty-move rule"""
+    return position.halfmove >= 100 or position.repetition_count() >= 3 or not position.legal_moves()
+
+def validate_move(room, writer, wire_move):
+    """The legal move matching (from, to, promotion) if it is this player's turn, else None"""
+    position = room.position
+    if position is None or room.over or writer not in room.players or room.players.index(writer) != position.side:
+        return None
+    from_sq, to_sq, promo = wire_move
+    for move in position.legal_moves(from_sq):
+        if bitboard.move_to(move) == to_sq and bitboard.move_promo(move) == promo:
+            return move
+    return None
+
+def resume_game(writer, token, ply, room_id):
+    """Put a reconnecting player back in their seat and send the snapshot; the room, or None"""
+    addr = writer.get_extra_info('peername')
+    room = rooms.get(room_id)
+    color = None
+    if room is not None:
+        for index, expected in enumerate(room.tokens):
+            if secrets.compare_digest(token, expected):
+                color = index
+    if color is None:
+        print(f"[RESUME REFUSED] {addr} for room '{room_id}'")
+        writer.write(protocol.encode_frame(protocol.ERROR, b"unknown session"))
+        return None
+    previous = room.players[color]
+    if previous is not None:
+        # The old connection has not noticed it is dead yet; the new one wins
+        previous.close()
+    room.players[color] = writer
+    if None not in room.players and room.expiry is not None:
+        room.expiry.cancel()
+        room.expiry = None
+    print(f"[RESUMED] {addr} is back in room '{room_id}' at ply {ply}")
+    writer.write(room.snapshot(color, ply))
+    return room
 
-def start_server():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT))
-    server.listen()
+def leave_room(room, writer):
+    """Drop a player; a game in progress waits RESUME_GRACE seconds for them, otherwise the room closes"""
+    if writer not in room.players:
+        # Replaced by a resumed connection; the room carries on
+        return
+    if room.position is None or room.over:
+        # Nothing to resume before the game starts or once it is over
+        close_room(room)
+        return
+    room.players[room.players.index(writer)] = None
+    print(f"[PLAYER DROPPED] room '{room.room_id}' waits {RESUME_GRACE}s for them to resume")
+    if room.expiry is None:
+        room.expiry = asyncio.get_running_loop().call_later(RESUME_GRACE, close_room, room)
+
+def close_room(room):
+    if room.expiry is not None:
+        room.expiry.cancel()
+        room.expiry = None
+    for player in room.players:
+        if player is not None:
+            player.close()
+    for spectator in room.spectators:
+        spectator.close()
+    room.players.clear()
+    room.spectators.clear()
+    if rooms.get(room.room_id) is room:
+        del rooms[room.room_id]
+        print(f"[ROOM CLOSED] '{room.room_id}' ({len(rooms)} rooms open)")
+
+async def start_server():
+    server = await asyncio.start_server(handle_client, HOST, PORT, limit=READ_LIMIT)
     print(f"[STARTED] Server running on {HOST}:{PORT}")
+    async with server:
+        await server.serve_forever()
+
+# Sharded mode: a front end accepts connections, reads each JOIN and hands the
+# socket to the worker process that owns the room (crc32 of the room id modulo
+# the worker count), so both players of a room always land in the same worker.
+
+def shard_for(room_id_bytes, shards):
+    return zlib.crc32(room_id_bytes) % shards
+
+async def route_client(conn, addr, channels):
+    """Read the JOIN frame and pass the socket, with the bytes read so far, to its shard"""
+    loop = asyncio.get_running_loop()
+    decoder = protocol.FrameDecoder()
+    try:
+        frames = []
+        while not frames:
+            data = await asyncio.wait_for(loop.sock_recv(conn, protocol.MAX_FRAME), JOIN_TIMEOUT)
+            if not data:
+                return
+            frames = decoder.feed(data)
+        msg_type, payload = frames[0]
+        if msg_type == protocol.RESUME:
+            payload = protocol.decode_resume(payload)[2].encode()
+        elif msg_type not in (protocol.JOIN, protocol.WATCH):
+            await loop.sock_sendall(conn, protocol.encode_frame(protocol.ERROR, b"expected JOIN"))
+            return
+        # Replay everything already read so the worker sees the stream from the start
+        handoff = b''.join(protocol.encode_frame(t, p) for t, p in frames) + bytes(decoder.buffer)
+        socket.send_fds(channels[shard_for(payload, len(channels))], [handoff], [conn.fileno()])
+    except (OSError, asyncio.TimeoutError, UnicodeDecodeError, protocol.ProtocolError) as e:
+        print(f"[ERROR] {addr}: {e}")
+    finally:
+        # The worker holds its own duplicate of the descriptor
+        conn.close()
+
+async def adopt_connection(sock, initial):
+    """Run a handed-off client socket through handle_client in this worker"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=READ_LIMIT)
+    reader.feed_data(initial)
+    transport, stream_protocol = await loop.connect_accepted_socket(
+        lambda: asyncio.StreamReaderProtocol(reader), sock)
+    writer = asyncio.StreamWriter(transport, stream_protocol, reader, loop)
+    await handle_client(reader, writer)
 
+async def serve_shard(index, channel, counters):
+    loop = asyncio.get_running_loop()
+    channel.setblocking(False)
+    closed = loop.create_future()
+
+    def on_handoff():
+        try:
+            data, fds, _, _ = socket.recv_fds(channel, HANDOFF_SIZE, 1)
+        except BlockingIOError:
+            return
+        if not data and not fds:
+            # Front end has gone away
+            if not closed.done():
+                closed.set_result(None)
+            return
+        for fd in fds:
+            task = loop.create_task(adopt_connection(socket.socket(fileno=fd), data))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+    loop.add_reader(channel.fileno(), on_handoff)
+    while not closed.done():
+        counters[index * 2] = len(rooms)
+        counters[index * 2 + 1] = messages_relayed
+        await asyncio.wait([closed], timeout=1)
+
+def run_shard(index, channel, counters, inherited):
+    # Close the front end's channel ends copied in by fork, so each shard sees
+    # end-of-file on its own channel as soon as the front end exits
+    for other in inherited:
+        other.close()
+    asyncio.run(serve_shard(index, channel, counters))
+
+async def report_load(counters, shards):
+    previous = [0] * shards
     while True:
-        conn, addr = server.accept()
-        threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
+        await asyncio.sleep(STATS_INTERVAL)
+        report = []
+        for i in range(shards):
+            relayed = counters[i * 2 + 1]
+            report.append(f"shard {i}: {counters[i * 2]} rooms {(relayed - previous[i]) / STATS_INTERVAL:.1f} msg/s")
+            previous[i] = relayed
+        print("[LOAD] " + " | ".join(report))
+
+async def start_sharded_server(workers):
+    counters = multiprocessing.Array('q', workers * 2, lock=False)
+    channels = []
+    for index in range(workers):
+        parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        process = multiprocessing.Process(target=run_shard, args=(index, child_end, counters, channels + [parent_end]),
+                                          daemon=True)
+        process.start()
+        child_end.close()
+        channels.append(parent_end)
+
+    listener = socket.create_server((HOST, PORT))
+    listener.setblocking(False)
+    print(f"[STARTED] Server running on {HOST}:{PORT} with {workers} shard processes")
+    loop = asyncio.get_running_loop()
+    # Exit normally on SIGTERM so multiprocessing stops the shard processes
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    reporter = asyncio.create_task(report_load(counters, workers))
+    try:
+        while True:
+            conn, addr = await loop.sock_accept(listener)
+            print(f"[NEW CONNECTION] {addr} connected.")
+            task = asyncio.create_task(route_client(conn, addr, channels))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+    finally:
+        reporter.cancel()
+        listener.close()
+
+def main():
+    global HOST, PORT
+    parser = argparse.ArgumentParser(description="Chess room relay server")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="shard rooms across this many processes (0 = one per core, 1 = single process)")
+    args = parser.parse_args()
+    HOST, PORT = args.host, args.port
+    workers = args.workers or os.cpu_count()
+    if workers == 1:
+        asyncio.run(start_server())
+    else:
+        try:
+            asyncio.run(start_sharded_server(workers))
+        except asyncio.CancelledError:
+            pass
 
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    main()
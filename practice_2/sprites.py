@@ -0,0 +1,46 @@
+import os
+
+import pygame
+
+PIECE_TYPES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+
+
+class SpriteAtlas:
+    """Piece images loaded once and scaled once per square size.
+
+    Surfaces are shared by every piece of the same color and type. Call
+    after pygame.display.set_mode(), since convert_alpha() needs a display.
+    """
+
+    def __init__(self, image_dir='images', size=None):
+        self.image_dir = image_dir
+        self.size = size
+        self.sources = {}
+        self.sprites = {}
+        if size is not None:
+            self.resize(size)
+
+    def _source(self, color, piece_type):
+        key = (color, piece_type)
+        image = self.sources.get(key)
+        if image is None:
+            path = os.path.join(self.image_dir, f'{color}_{piece_type}.png')
+            image = self.sources[key] = pygame.image.load(path).convert_alpha()
+        return image
+
+    def get(self, color, piece_type, size=None):
+        size = self.size if size is None else size
+        key = (color, piece_type, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.transform.smoothscale(self._source(color, piece_type), (size, size))
+            self.sprites[key] = sprite
+        return sprite
+
+    def resize(self, size):
+        """Rescale every piece for a new square size, dropping sprites of the old one"""
+        self.size = size
+        self.sprites = {}
+        for color in ('white', 'black'):
+            for piece_type in PIECE_TYPES:
+                self.get(color, piece_type, size)
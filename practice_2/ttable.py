@@ -0,0 +1,38 @@
+class TranspositionTable:
+    """Fixed-size hash table of per-position results, keyed by Zobrist hash.
+
+    Each key maps to one slot (hash modulo a power-of-two size). A new entry
+    replaces the slot's occupant unless that occupant was stored from a
+    deeper search, so memory never grows past the initial allocation.
+    """
+
+    def __init__(self, size_bits=16):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        self.depths = [-1] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key, depth=0):
+        """Stored value for key if it was searched at least `depth` deep, else None"""
+        slot = key & self.mask
+        if self.keys[slot] == key and self.depths[slot] >= depth:
+            self.hits += 1
+            return self.values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        slot = key & self.mask
+        if self.keys[slot] != key and self.depths[slot] > depth:
+            return
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        self.depths = [-1] * self.size
@@ -0,0 +1,159 @@
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+import features
+
+# Append-only landmark recordings for tuning gestures offline.
+#
+# A file is a small header followed by fixed-size records, one per frame, so
+# it can be appended to across sessions and opened with np.memmap without
+# reading it into memory. The header is the magic, the JSON length as a
+# little-endian uint32 and the JSON itself ({"gestures": [names]}), padded
+# with spaces to a multiple of 64 bytes. Bit i of a record's `gestures` is
+# set when gesture i of the header fired on that frame.
+MAGIC = b'HANDREC1'
+EXTENSION = '.hrec'
+HEADER_ALIGN = 64
+MAX_GESTURES = 32
+
+RECORD = np.dtype([
+    ('time', '<f8'),                                     # capture time, seconds since the epoch
+    ('frame', '<u4'),                                    # pipeline frame index
+    ('handedness', 'u1'),                                # see HANDEDNESS; 0 = unknown or no hand
+    ('confidence', '<f4'),                               # handedness score; 0 for predicted frames
+    ('landmarks', '<f4', (features.NUM_LANDMARKS, 3)),   # unfiltered, NaN when no hand
+    ('gestures', '<u4'),                                 # bit mask of fired gestures
+])
+
+HANDEDNESS = {'Left': 1, 'Right': 2}
+
+
+def _header(gesture_names):
+    text = json.dumps({'gestures': list(gesture_names)}).encode()
+    size = len(MAGIC) + 4 + len(text)
+    padding = -size % HEADER_ALIGN
+    return MAGIC + struct.pack('<I', len(text) + padding) + text + b' ' * padding
+
+
+def read_header(f):
+    """(gesture names, header size in bytes) from an open recording"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a hand recording")
+    size, = struct.unpack('<I', f.read(4))
+    info = json.loads(f.read(size))
+    return info['gestures'], len(MAGIC) + 4 + size
+
+
+def load(path):
+    """(records, gesture names) of a recording; records is a read-only memory map of RECORD.
+
+    A record cut short by a crash at the end of the file is ignored.
+    """
+    with open(path, 'rb') as f:
+        names, offset = read_header(f)
+    count = (os.path.getsize(path) - offset) // RECORD.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD), names
+    return np.memmap(path, dtype=RECORD, mode='r', offset=offset, shape=(count,)), names
+
+
+def fired_names(mask, names):
+    """Gesture names set in one record's `gestures` mask"""
+    return [name for i, name in enumerate(names) if int(mask) >> i & 1]
+
+
+def hand_info(processed):
+    """(landmarks, handedness, confidence) of the first hand in a tracking result"""
+    if not processed.multi_hand_landmarks:
+        return None, 0, 0.0
+    points = features.landmark_array(processed.multi_hand_landmarks[0])
+    if not processed.multi_handedness:
+        return points, 0, 0.0
+    label = processed.multi_handedness[0].classification[0]
+    return points, HANDEDNESS.get(label.label, 0), label.score
+
+
+class Recorder:
+    """Appends one record per frame to a recording from a background writer thread.
+
+    record() only fills a slot of a preallocated ring buffer, so the live loop
+    never waits on the disk. The writer thread drains the ring in batches. If
+    the disk falls so far behind that the ring is full, new frames are counted
+    in `dropped` and discarded rather than blocking the caller.
+    """
+
+    def __init__(self, path, gesture_names, capacity=4096, batch=256):
+        if len(gesture_names) > MAX_GESTURES:
+            raise ValueError(f"Recordings hold at most {MAX_GESTURES} gestures")
+        self.bits = {name: 1 << i for i, name in enumerate(gesture_names)}
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(_header(gesture_names))
+        else:
+            with open(path, 'rb') as f:
+                names, offset = read_header(f)
+            if names != list(gesture_names):
+                self.file.close()
+                raise ValueError(f"{path} was recorded with gestures {names}, not {list(gesture_names)}")
+            # Cut off a record left incomplete by a crash, or every new one would be misaligned
+            self.file.truncate(offset + (self.file.tell() - offset) // RECORD.itemsize * RECORD.itemsize)
+        # record() takes perf_counter times; stored times are wall-clock so sessions appended later sort after
+        self.epoch_offset = time.time() - time.perf_counter()
+        self.ring = np.zeros(capacity, dtype=RECORD)
+        self.batch = batch
+        self.head = 0  # next record to write to disk
+        self.count = 0  # records waiting in the ring
+        self.condition = threading.Condition()
+        self.running = True
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='recorder', daemon=True)
+        self.thread.start()
+
+    def record(self, now, frame, points, handedness=0, confidence=0.0, fired=()):
+        """Queue one frame captured at perf_counter() time `now`; points is the (21, 3) landmarks, or None"""
+        with self.condition:
+            if self.count == len(self.ring):
+                self.dropped += 1
+                return
+            slot = self.ring[(self.head + self.count) % len(self.ring)]
+            slot['time'] = now + self.epoch_offset
+            slot['frame'] = frame
+            slot['handedness'] = handedness
+            slot['confidence'] = confidence
+            slot['landmarks'] = np.nan if points is None else points
+            slot['gestures'] = sum(self.bits.get(name, 0) for name in fired)
+            self.count += 1
+            if self.count >= self.batch:
+                self.condition.notify()
+
+    def close(self):
+        """Write out everything still queued and close the file"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        self.file.close()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.running and self.count < self.batch:
+                    self.condition.wait(timeout=1)
+                if not self.count:
+                    if not self.running:
+                        return
+                    continue
+                # Copy out the contiguous run at the head; a wrapped remainder goes next time
+                count = min(self.count, len(self.ring) - self.head)
+                data = self.ring[self.head:self.head + count].tobytes()
+                self.head = (self.head + count) % len(self.ring)
+                self.count -= count
+            self.file.write(data)
+            self.file.flush()
+            self.written += count
@@ -0,0 +1,203 @@
+"""Replay a recorded session through gesture detection, headless and as fast as possible.
+
+The input is either a video file, which goes through hand tracking like the
+webcam does, or landmarks, which skip tracking so only gesture detection is
+measured: a .npy of shape (frames, 21, 3), NaN for frames without a hand, or a
+.hrec recording made with HAND_RECORDING (see recording.py), whose gestures
+are reported next to what fired live. Nothing is drawn and no pointer moves;
+the gestures that fire are printed or written out, and can be checked against
+a previous run:
+
+    python3 replay.py session.mp4 --events expected.csv
+    python3 replay.py session.mp4 --expect expected.csv
+    python3 replay.py landmarks.npy --rules chess --fps 60
+    python3 replay.py session.hrec --model tuned.npz
+"""
+import argparse
+import collections
+import csv
+import sys
+import time
+
+import numpy as np
+
+import features
+import filters
+import gestures
+import pipeline
+import recording
+from features import HandFeatures
+
+RULE_SETS = {'mouse': gestures.MOUSE_RULES, 'chess': gestures.CHESS_RULES}
+
+# Landmarks of a frame without a hand
+NO_HAND = np.full((features.NUM_LANDMARKS, 3), np.nan)
+
+
+def video_inference():
+    """Inference stage for video frames, reduced to the (21, 3) landmark array.
+
+    Runs the full model within the tracked crop on every frame: the live
+    scripts' motion-based scheduling depends on wall-clock time, which would
+    make replays at full speed give different results from run to run.
+    """
+    import cv2
+    import mediapipe as mp
+    import tracking
+
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=False,
+        model_complexity=1,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        max_num_hands=1
+    )
+    roi = tracking.RoiTracker()
+
+    def infer(frame):
+        processed = roi.process(hands, cv2.flip(frame, 1))
+        if not processed.multi_hand_landmarks:
+            return None, NO_HAND
+        return None, features.landmark_array(processed.multi_hand_landmarks[0])
+    return infer
+
+
+def landmark_inference(points):
+    """Inference stage for landmark recordings: already done"""
+    return None, points
+
+
+def open_source(args):
+    """(source, infer) for the file named on the command line"""
+    if args.path.endswith(recording.EXTENSION):
+        records, _ = recording.load(args.path)
+        times = records['time'] - records['time'][0] if len(records) else None
+        return pipeline.LandmarkFileSource(records['landmarks'], timestamps=times), landmark_inference
+    if args.path.endswith('.npy'):
+        timestamps = np.load(args.timestamps) if args.timestamps else None
+        return pipeline.LandmarkFileSource(args.path, args.fps, timestamps), landmark_inference
+    return pipeline.VideoFileSource(args.path), video_inference()
+
+
+def recorded_rules(path):
+    """Name of the rule set whose gestures a recording was made with, or None"""
+    _, names = recording.load(path)
+    for name, rules in RULE_SETS.items():
+        if [rule.name for rule in rules] == names:
+            return name
+    return None
+
+
+def recorded_counts(path):
+    """How often each gesture fired live in a recording"""
+    records, names = recording.load(path)
+    return {name: int(np.count_nonzero(records['gestures'] >> i & 1)) for i, name in enumerate(names)}
+
+
+class GestureSink:
+    """Headless end of the pipeline: filters and evaluates each frame and records what fires"""
+
+    def __init__(self, engine, landmark_filter):
+        self.engine = engine
+        self.landmark_filter = landmark_filter
+        self.frames = 0
+        self.hand_frames = 0
+        self.counts = collections.Counter()
+        # (frame, time, gesture) in firing order
+        self.events = []
+
+    def process(self, index, now, points):
+        self.frames += 1
+        if np.isnan(points).any():
+            # Same as the live scripts: held gestures survive a brief dropout
+            if self.engine.hand_lost(now):
+                self.landmark_filter.reset()
+            return []
+        self.hand_frames += 1
+        hand = HandFeatures(self.landmark_filter(points, now))
+        fired = self.engine.evaluate(hand, now)
+        for name in fired:
+            self.events.append((index, now, name))
+            self.counts[name] += 1
+        return fired
+
+
+def write_events(path, events):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frame', 'time', 'gesture'])
+        for index, now, name in events:
+            writer.writerow([index, f'{now:.4f}', name])
+
+
+def read_events(path):
+    with open(path, newline='') as f:
+        return [(int(row['frame']), row['gesture']) for row in csv.DictReader(f)]
+
+
+def compare_events(expected, events):
+    """Description of the first difference between two runs, or None if they match"""
+    actual = [(index, name) for index, _, name in events]
+    for i, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            return f"event {i}: expected {want[1]} at frame {want[0]}, got {got[1]} at frame {got[0]}"
+    if len(expected) != len(actual):
+        return f"expected {len(expected)} events, got {len(actual)}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through gesture detection")
+    parser.add_argument('path', help="video file, .npy landmarks or .hrec recording")
+    parser.add_argument('--rules', choices=sorted(RULE_SETS),
+                        help="gesture rules to replay; default mouse, or the ones a .hrec was recorded with")
+    parser.add_argument('--model', help="trained gesture classifier (.npz) to add to the rules")
+    parser.add_argument('--fps', type=float, default=30.0, help="frame rate of a landmark recording")
+    parser.add_argument('--timestamps', help=".npy of per-frame times in seconds for a landmark recording")
+    parser.add_argument('--events', help="write the gestures that fired to this CSV file")
+    parser.add_argument('--expect', help="CSV from an earlier --events run; exit 1 if the gestures differ")
+    args = parser.parse_args()
+    if args.path.endswith(recording.EXTENSION):
+        recorded_with = recorded_rules(args.path)
+        if recorded_with is None and args.rules is None:
+            parser.error(f"{args.path} was recorded with gestures {recording.load(args.path)[1]}; choose --rules")
+        if recorded_with is not None and args.rules not in (None, recorded_with):
+            parser.error(f"{args.path} was recorded with the {recorded_with} rules, not {args.rules}")
+        args.rules = args.rules or recorded_with
+    args.rules = args.rules or 'mouse'
+
+    classifier = gestures.LinearClassifier.load(args.model) if args.model else None
+    sink = GestureSink(gestures.GestureEngine(RULE_SETS[args.rules], classifier),
+                       filters.OneEuroFilter(min_cutoff=1.0, beta=10.0))
+    source, infer = open_source(args)
+    recorded = recorded_counts(args.path) if args.path.endswith(recording.EXTENSION) else None
+
+    start = time.perf_counter()
+    pipe = pipeline.Pipeline(source, infer, lossless=True).start()
+    try:
+        for packet in pipe.results():
+            sink.process(packet.index, source.timestamp(packet.index), packet.result)
+    finally:
+        pipe.stop()
+        source.release()
+    elapsed = time.perf_counter() - start
+
+    print(f"{sink.frames} frames in {elapsed:.2f}s ({sink.frames / max(elapsed, 1e-9):.0f} frames/s), "
+          f"hand in {sink.hand_frames}")
+    print(pipe.stats())
+    for rule in RULE_SETS[args.rules]:
+        live = f" (live {recorded.get(rule.name, 0)})" if recorded is not None else ''
+        print(f"  {rule.name}: {sink.counts[rule.name]}{live}")
+
+    if args.events:
+        write_events(args.events, sink.events)
+    if args.expect:
+        difference = compare_events(read_events(args.expect), sink.events)
+        if difference:
+            print(f"Gestures differ from {args.expect}: {difference}")
+            sys.exit(1)
+        print(f"Gestures match {args.expect}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import time
+
+import actuation
+
+
+def wait_for(predicate, timeout=1.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def moves(backend):
+    return [(t, args) for t, action, args in backend.events if action == 'move']
+
+
+def test_targets_coalesce_to_one_move_per_refresh():
+    backend = actuation.NullBackend()
+    actuator = actuation.Actuator(backend, refresh_hz=20).start()
+    try:
+        for i in range(200):
+            actuator.move_to(i, i)
+            time.sleep(0.001)
+        wait_for(lambda: moves(backend) and moves(backend)[-1][1] == (199, 199))
+    finally:
+        actuator.stop()
+    sent = moves(backend)
+    assert len(sent) < 200 / 10
+    assert actuator.moves_sent == len(sent)
+    assert actuator.moves_skipped + actuator.moves_sent == 200
+    gaps = [b[0] - a[0] for a, b in zip(sent, sent[1:])]
+    assert min(gaps) >= actuator.interval - 0.002
+
+
+def test_sub_pixel_moves_are_skipped():
+    backend = actuation.NullBackend()
+    actuator = actuation.Actuator(backend, refresh_hz=200).start()
+    try:
+        actuator.move_to(100.2, 50.4)
+        wait_for(lambda: moves(backend))
+        actuator.move_to(99.6, 49.8)
+        wait_for(lambda: actuator.moves_skipped)
+        actuator.move_to(101.2, 50.4)
+        wait_for(lambda: len(moves(backend)) == 2)
+    finally:
+        actuator.stop()
+    assert [args for _, args in moves(backend)] == [(100, 50), (101, 50)]
+    assert actuator.moves_skipped == 1
+
+
+def test_click_sends_pending_move_first():
+    backend = actuation.NullBackend()
+    actuator = actuation.Actuator(backend, refresh_hz=2).start()
+    try:
+        actuator.move_to(10, 10)
+        wait_for(lambda: moves(backend))
+        # Would wait half a second for the next refresh, but the click must land on it
+        actuator.move_to(20, 20)
+        actuator.click()
+        wait_for(lambda: len(backend.events) == 3)
+    finally:
+        actuator.stop()
+    events = list(backend.events)
+    assert [(action, args) for _, action, args in events] == [
+        ('move', (10, 10)), ('move', (20, 20)), ('click', ('left', 1))]
+    assert events[-1][0] - events[0][0] < actuator.interval / 2
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import filters
+
+FPS = 30
+
+
+def exponential(samples, factor=0.7):
+    """The fixed-factor smoother the One Euro filter replaced"""
+    out = [samples[0]]
+    for value in samples[1:]:
+        out.append(out[-1] + factor * (value - out[-1]))
+    return np.array(out)
+
+
+def one_euro(samples):
+    f = filters.OneEuroFilter(min_cutoff=1.0, beta=10.0)
+    return np.array([f(value, i / FPS) for i, value in enumerate(samples)])
+
+
+def test_jittery_constant_converges():
+    rng = np.random.default_rng(0)
+    samples = 0.5 + rng.normal(0, 0.003, (300, 21, 3))
+    out = one_euro(samples)[150:]
+    assert abs(out.mean() - 0.5) < 1e-3
+    assert out.std() < samples[150:].std() / 2.5
+
+
+def test_smooths_more_than_fixed_factor_at_rest():
+    rng = np.random.default_rng(1)
+    samples = 0.5 + rng.normal(0, 0.003, (300, 2))
+    assert one_euro(samples)[150:].var() < exponential(samples)[150:].var() / 4
+
+
+def test_lags_less_than_fixed_factor_when_moving():
+    # 1.5 frame widths per second
+    samples = np.arange(60)[:, None] * 1.5 / FPS * np.ones(2)
+    truth = samples[-1]
+    assert abs(one_euro(samples)[-1] - truth).max() < abs(exponential(samples)[-1] - truth).max()
+
+
+def test_reset_forgets_history():
+    f = filters.OneEuroFilter()
+    f(np.zeros(3), 0.0)
+    f.reset()
+    assert np.array_equal(f(np.ones(3), 0.1), np.ones(3))
+
+
+def test_active_area_round_trip(tmp_path):
+    area = filters.ActiveArea(0.2, 0.1, 0.7, 0.6)
+    path = tmp_path / 'calibration.json'
+    area.save(path)
+    loaded = filters.ActiveArea.load(path)
+    points = np.array([[0.2, 0.1], [0.45, 0.35], [0.7, 0.6], [0.0, 1.0]])
+    assert np.allclose(loaded.to_unit(points), [[0, 0], [0.5, 0.5], [1, 1], [0, 1]])
+    assert np.allclose(loaded.to_unit(points), area.to_unit(points))
+    assert np.allclose(loaded.to_screen(points[1], 1921, 1081), [960, 540])
+
+
+def test_calibrate_fits_samples():
+    rng = np.random.default_rng(2)
+    samples = rng.uniform((0.3, 0.2), (0.8, 0.6), (500, 2))
+    area = filters.ActiveArea.calibrate(samples)
+    assert np.allclose(area.low, (0.3 - 0.02, 0.2 - 0.02), atol=0.02)
+    assert np.allclose(area.high, (0.8 + 0.02, 0.6 + 0.02), atol=0.02)
+    with pytest.raises(ValueError):
+        filters.ActiveArea.calibrate(samples[:10])
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import gestures
+import util
+from features import (INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_TIP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_TIP,
+                      THUMB_TIP, HandFeatures)
+
+
+def old_cursor_control(points):
+    """mouse.py's is_mouse_control_mode before the rule engine"""
+    index_extended = points[INDEX_FINGER_TIP, 1] < points[INDEX_FINGER_PIP, 1] < points[INDEX_FINGER_MCP, 1]
+    thumb_closed = np.hypot(*(points[THUMB_TIP, :2] - points[INDEX_FINGER_MCP, :2])) < 0.1
+    return index_extended and thumb_closed
+
+
+def old_left_click(points):
+    """mouse.py's is_left_click before the rule engine"""
+    return (util.get_angle(points[5], points[6], points[8]) < 50 and
+            util.get_angle(points[9], points[10], points[12]) > 90 and
+            util.get_distance([points[THUMB_TIP][:2], points[INDEX_FINGER_TIP][:2]]) > 50)
+
+
+def test_mouse_rules_match_old_predicates():
+    engine = gestures.GestureEngine(gestures.MOUSE_RULES)
+    assert engine.names == ['cursor_control', 'left_click']
+    rng = np.random.default_rng(0)
+    hits = np.zeros(2, dtype=int)
+    for _ in range(3000):
+        points = rng.random((21, 3))
+        active = engine.active(HandFeatures(points))
+        assert list(active) == [old_cursor_control(points), old_left_click(points)]
+        hits += active
+    # Both gestures actually occur in the sample, so the comparison covers both outcomes
+    assert hits.all()
+
+
+def pinch(gap):
+    points = np.full((21, 3), 0.5)
+    points[INDEX_FINGER_TIP, 0] += gap
+    return HandFeatures(points)
+
+
+def test_edge_rules_fire_once_per_transition():
+    engine = gestures.GestureEngine(gestures.CHESS_RULES[:2])
+    closed, opened = pinch(0.01), pinch(0.2)
+    fired = [engine.evaluate(hand, now) for hand, now in
+             [(closed, 0.0), (closed, 0.1), (opened, 0.5), (opened, 0.6), (closed, 0.7)]]
+    assert fired == [['pick_up'], [], ['drop'], [], ['pick_up']]
+
+
+def test_cooldown_suppresses_repeats():
+    engine = gestures.GestureEngine(gestures.CHESS_RULES[:2])
+    closed, opened = pinch(0.01), pinch(0.2)
+    assert engine.evaluate(closed, 0.0) == ['pick_up']
+    assert engine.evaluate(opened, 0.1) == ['drop']
+    # Pinched and released again within the 0.3 s cooldowns
+    assert engine.evaluate(closed, 0.2) == []
+    assert engine.evaluate(opened, 0.25) == []
+    assert engine.evaluate(closed, 0.4) == ['pick_up']
+
+
+def test_classifier_fires_rule_without_conditions(tmp_path):
+    path = tmp_path / 'model.npz'
+    np.savez(path, weights=np.zeros((2, gestures.FEATURE_COLUMNS)), bias=np.array([5.0, 0.0]),
+             labels=np.array(['swipe', 'other']))
+    engine = gestures.GestureEngine([gestures.Rule('swipe', [])], gestures.LinearClassifier.load(path))
+    assert engine.evaluate(pinch(0.2), 0.0) == ['swipe']
+
+
+def test_unknown_angle_is_rejected():
+    rule = gestures.Rule('bad', [('angle', (MIDDLE_FINGER_TIP, MIDDLE_FINGER_PIP, THUMB_TIP), '<', 10)])
+    with pytest.raises(ValueError):
+        gestures.GestureEngine([rule])
+
+
+def test_short_dropout_keeps_held_gesture():
+    engine = gestures.GestureEngine(gestures.CHESS_RULES[:2])
+    closed = pinch(0.01)
+    assert engine.evaluate(closed, 0.0) == ['pick_up']
+    assert not engine.hand_lost(0.1)
+    assert engine.evaluate(closed, 0.5) == []
+    # Gone long enough: the pinch counts as new when the hand comes back
+    assert not engine.hand_lost(0.6)
+    assert engine.hand_lost(0.9)
+    assert engine.evaluate(closed, 1.0) == ['pick_up']
@@ -0,0 +1,75 @@
+import queue
+import socket
+import threading
+import time
+
+import handinput
+
+
+def listen():
+    """Free UDP port and a queue filled from receive_events() on it"""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    events = queue.Queue()
+    ready = threading.Event()
+
+    def run():
+        receiver = handinput.receive_events(port)
+        ready.set()
+        for event in receiver:
+            events.put(event)
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return port, events
+
+
+def connect(port, events):
+    """Sender whose pointer events have been seen to arrive, with nothing left queued"""
+    sender = handinput.HandEventSender(port=port)
+    # The receiver binds on its first next(); pointers sent before that are lost
+    while events.empty():
+        sender.send(handinput.POINTER, 0, 0)
+        time.sleep(0.02)
+    time.sleep(0.05)
+    while not events.empty():
+        events.get()
+    return sender
+
+
+def received(events, count):
+    return [events.get(timeout=2)[0] for _ in range(count)]
+
+
+def send_all(sender, kinds):
+    for kind in kinds:
+        sender.send(kind, 0.5, 0.5)
+
+
+def test_round_trip():
+    data = handinput.encode_event(handinput.DROP, 0.25, 0.75, sequence=7, session=3)
+    assert handinput.decode_event(data) == (handinput.DROP, 3, 7, 0.25, 0.75)
+    assert handinput.decode_event(data[:-1]) is None
+
+
+def test_repeated_gestures_arrive_once():
+    port, events = listen()
+    sender = connect(port, events)
+    P = handinput.POINTER
+    send_all(sender, [handinput.PICK_UP, P, handinput.DROP, P, P, P])
+    assert received(events, 6) == [handinput.PICK_UP, P, handinput.DROP, P, P, P]
+    assert events.empty()
+
+
+def test_restarted_sender_is_not_taken_for_repeats():
+    port, events = listen()
+    first = connect(port, events)
+    send_all(first, [handinput.PICK_UP, handinput.DROP])
+    assert received(events, 2) == [handinput.PICK_UP, handinput.DROP]
+    second = handinput.HandEventSender(port=port)
+    # A restart may draw the same session byte; force the case the nonce guards against
+    second.session = (first.session + 1) % 256
+    send_all(second, [handinput.PICK_UP, handinput.DROP])
+    assert received(events, 2) == [handinput.PICK_UP, handinput.DROP]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import protocol
+from bitboard import START_FEN
+
+FRAMES = [
+    (protocol.JOIN, b'room'),
+    (protocol.WAIT, b''),
+    (protocol.MOVE, protocol.encode_move(12, 28)),
+    (protocol.STATE, START_FEN.encode()),
+]
+
+
+def encoded(frames):
+    return b''.join(protocol.encode_frame(msg_type, payload) for msg_type, payload in frames)
+
+
+def test_decoder_fed_one_byte_at_a_time():
+    decoder = protocol.FrameDecoder()
+    data = encoded(FRAMES)
+    frames = []
+    for i in range(len(data)):
+        frames.extend(decoder.feed(data[i:i + 1]))
+    assert frames == FRAMES
+    assert not decoder.buffer
+
+
+def test_decoder_splits_several_frames_in_one_read():
+    decoder = protocol.FrameDecoder()
+    data = encoded(FRAMES)
+    # All frames plus the first byte of another
+    assert decoder.feed(data + data[:1]) == FRAMES
+    assert decoder.feed(data[1:]) == FRAMES
+
+
+def test_decoder_rejects_bad_length():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.FrameDecoder().feed(protocol.HEADER.pack(0, protocol.MOVE))
+
+
+def test_resume_round_trip():
+    token = os.urandom(protocol.TOKEN_SIZE)
+    [(msg_type, payload)] = protocol.FrameDecoder().feed(protocol.resume_frame(token, 300, 'room'))
+    assert msg_type == protocol.RESUME
+    assert protocol.decode_resume(payload) == (token, 300, 'room')
+
+
+def test_snapshot_round_trip():
+    moves = [(12, 28, 0), (52, 36, 0), (49, 57, 5)]
+    frame = protocol.snapshot_frame(1, 7, START_FEN, [protocol.encode_move(*move) for move in moves])
+    [(msg_type, payload)] = protocol.FrameDecoder().feed(frame)
+    assert msg_type == protocol.SNAPSHOT
+    assert protocol.decode_snapshot(payload) == (1, 7, START_FEN, moves)
+
+
+def test_snapshot_without_moves():
+    [(_, payload)] = protocol.FrameDecoder().feed(protocol.snapshot_frame(0, 0, START_FEN))
+    assert protocol.decode_snapshot(payload) == (0, 0, START_FEN, [])
@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import pytest
+
+import recording
+
+NAMES = ['pick_up', 'drop']
+
+
+def write_session(path, frames, points):
+    recorder = recording.Recorder(path, NAMES, capacity=256, batch=8)
+    for i in range(frames):
+        recorder.record(time.perf_counter(), i, None if i % 4 == 0 else points + i, 2, 0.9,
+                        ['drop'] if i % 5 == 0 else ())
+    recorder.close()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'session.hrec'
+    points = np.random.default_rng(0).random((21, 3))
+    recorder = write_session(path, 100, points)
+    assert recorder.written == 100 and recorder.dropped == 0
+    records, names = recording.load(path)
+    assert names == NAMES
+    assert list(records['frame']) == list(range(100))
+    assert np.isnan(records['landmarks'][0]).all()
+    assert np.allclose(records['landmarks'][1], points + 1)
+    assert recording.fired_names(records['gestures'][5], names) == ['drop']
+    assert recording.fired_names(records['gestures'][6], names) == []
+
+
+def test_append_after_torn_record_stays_aligned(tmp_path):
+    path = tmp_path / 'session.hrec'
+    points = np.zeros((21, 3))
+    write_session(path, 10, points)
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 100)
+    assert len(recording.load(path)[0]) == 10
+    write_session(path, 3, points)
+    records, _ = recording.load(path)
+    assert list(records['frame']) == list(range(10)) + [0, 1, 2]
+    assert np.allclose(records['landmarks'][11], points + 1)
+
+
+def test_appended_sessions_keep_time_increasing(tmp_path):
+    path = tmp_path / 'session.hrec'
+    write_session(path, 10, np.zeros((21, 3)))
+    write_session(path, 10, np.zeros((21, 3)))
+    times = recording.load(path)[0]['time']
+    assert np.all(np.diff(times) >= 0)
+    assert abs(times[-1] - time.time()) < 60
+
+
+def test_append_with_other_gestures_is_refused(tmp_path):
+    path = tmp_path / 'session.hrec'
+    write_session(path, 1, np.zeros((21, 3)))
+    with pytest.raises(ValueError):
+        recording.Recorder(path, ['cancel'])
@@ -0,0 +1,200 @@
+import collections
+import time
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+import features
+
+# Stand-in for a hands.process() result on frames where inference was skipped
+PredictedHands = collections.namedtuple('PredictedHands', 'multi_hand_landmarks multi_handedness')
+
+
+class RoiTracker:
+    """Runs hand tracking on a crop around the hand found in the previous frame.
+
+    Only the crop is converted to RGB and passed to hands.process, optionally
+    downscaled to max_size pixels on its longest side. When the crop finds no
+    hand the same frame is searched in full, so a lost hand is picked up again
+    straight away. Landmarks are always returned in full-frame coordinates.
+
+    The crop only moves when the hand nears its edge or changes size a lot,
+    so MediaPipe's own frame-to-frame tracking sees a mostly stable image.
+    """
+
+    def __init__(self, margin=0.5, min_size=160, max_size=320, border=0.15):
+        self.margin = margin
+        self.min_size = min_size
+        self.max_size = max_size
+        self.border = border
+        # (x0, y0, x1, y1) in pixels, or None to search the full frame
+        self.box = None
+
+    def process(self, hands, frame, max_size=None):
+        """hands.process() on a BGR frame, through the crop when there is one"""
+        height, width = frame.shape[:2]
+        max_size = max_size or self.max_size
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            crop = frame[y0:y1, x0:x1]
+            scale = max_size / max(x1 - x0, y1 - y0) if max_size else 1
+            if scale < 1:
+                crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            processed = hands.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+            if processed.multi_hand_landmarks:
+                self._to_frame(processed, width, height)
+                self._follow(processed, width, height)
+                return processed
+            # Tracking lost: fall back to the full frame
+            self.box = None
+        processed = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if processed.multi_hand_landmarks:
+            self._follow(processed, width, height)
+        return processed
+
+    def _to_frame(self, processed, width, height):
+        """Map landmarks normalized to the crop back to the full frame"""
+        x0, y0, x1, y1 = self.box
+        crop_width, crop_height = x1 - x0, y1 - y0
+        for hand_landmarks in processed.multi_hand_landmarks:
+            for lm in hand_landmarks.landmark:
+                lm.x = (x0 + lm.x * crop_width) / width
+                lm.y = (y0 + lm.y * crop_height) / height
+                # z shares the scale of x
+                lm.z = lm.z * crop_width / width
+
+    def _follow(self, processed, width, height):
+        """Place the next frame's crop around the hand, keeping it still while the hand stays inside"""
+        landmarks = processed.multi_hand_landmarks[0].landmark
+        xs = [lm.x * width for lm in landmarks]
+        ys = [lm.y * height for lm in landmarks]
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+        side = max(right - left, bottom - top) * (1 + 2 * self.margin)
+        side = int(min(max(side, self.min_size), width, height))
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            inset = self.border * (x1 - x0)
+            inside = (x0 + inset <= left and right <= x1 - inset and
+                      y0 + inset <= top and bottom <= y1 - inset)
+            if inside and 0.6 * (x1 - x0) <= side <= x1 - x0:
+                return
+
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        x0 = int(min(max(center_x - side / 2, 0), width - side))
+        y0 = int(min(max(center_y - side / 2, 0), height - side))
+        self.box = (x0, y0, x0 + side, y0 + side)
+
+
+class LandmarkPredictor:
+    """Constant-velocity prediction of all 21 landmarks between inferred frames.
+
+    Each measurement is taken as-is; only the velocity is smoothed, so
+    predictions add no lag on frames where the model actually ran.
+    """
+
+    def __init__(self, smoothing=0.5, max_horizon=0.15, max_gap=0.3):
+        self.smoothing = smoothing
+        self.max_horizon = max_horizon
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self.points = None
+        self.velocity = None
+        self.time = None
+
+    def update(self, points, now):
+        """Record a (21, 3) landmark array measured at time `now`"""
+        if self.points is None or now - self.time > self.max_gap:
+            self.velocity = np.zeros_like(points)
+        elif now > self.time:
+            measured = (points - self.points) / (now - self.time)
+            self.velocity += self.smoothing * (measured - self.velocity)
+        self.points = points
+        self.time = now
+
+    def predict(self, now):
+        """Landmarks extrapolated to `now`, or None when no hand is tracked"""
+        if self.points is None:
+            return None
+        return self.points + self.velocity * min(now - self.time, self.max_horizon)
+
+    def speed(self):
+        """Speed of the hand's centre in normalized frame units per second"""
+        if self.velocity is None:
+            return 0.0
+        return float(np.hypot(*self.velocity[:, :2].mean(axis=0)))
+
+
+class AdaptiveInference:
+    """Chooses per frame how much hand tracking work to do.
+
+    While the hand moves every frame runs the full model. Once it is still
+    (with hysteresis between still_speed and twice that) only every
+    still_every-th frame runs the light model on a smaller crop, and frames in
+    between get landmarks predicted by constant velocity. With no hand in
+    view the light model looks for one on every idle_every-th frame.
+
+    Both models are tracking graphs that carry the last hand position over to
+    their next frame, so a graph is reset when the work switches to it rather
+    than tracking from where the hand was when it last ran.
+    """
+
+    def __init__(self, full_hands, light_hands, roi, still_speed=0.08, still_every=3, idle_every=2, light_size=192):
+        self.full_hands = full_hands
+        self.light_hands = light_hands
+        self.roi = roi
+        self.still_speed = still_speed
+        self.still_every = still_every
+        self.idle_every = idle_every
+        self.light_size = light_size
+        self.predictor = LandmarkPredictor()
+        self.last_hands = None
+        self.still = False
+        self.frame_index = 0
+        self.mode = None
+
+    def choose_mode(self):
+        if self.predictor.points is None:
+            return 'light' if self.frame_index % self.idle_every == 0 else 'predicted'
+        speed = self.predictor.speed()
+        if self.still and speed > 2 * self.still_speed:
+            self.still = False
+        elif not self.still and speed < self.still_speed:
+            self.still = True
+        if not self.still:
+            return 'full'
+        return 'light' if self.frame_index % self.still_every == 0 else 'predicted'
+
+    def process(self, frame):
+        """hands.process()-style result for a BGR frame, inferred or predicted"""
+        now = time.perf_counter()
+        self.frame_index += 1
+        self.mode = self.choose_mode()
+        if self.mode == 'predicted':
+            return self._predicted(now)
+        hands = self.full_hands if self.mode == 'full' else self.light_hands
+        if hands is not self.last_hands:
+            if self.last_hands is not None:
+                hands.reset()
+            self.last_hands = hands
+        if self.mode == 'full':
+            processed = self.roi.process(hands, frame)
+        else:
+            processed = self.roi.process(hands, frame, self.light_size)
+        if processed.multi_hand_landmarks:
+            self.predictor.update(features.landmark_array(processed.multi_hand_landmarks[0]), now)
+        else:
+            self.predictor.reset()
+            self.still = False
+        return processed
+
+    def _predicted(self, now):
+        points = self.predictor.predict(now)
+        if points is None:
+            return PredictedHands(None, None)
+        landmarks = landmark_pb2.NormalizedLandmarkList(
+            landmark=[landmark_pb2.NormalizedLandmark(x=x, y=y, z=z) for x, y, z in points.tolist()])
+        return PredictedHands([landmarks], None)